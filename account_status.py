@@ -0,0 +1,137 @@
+# Estado de cuentas IPTV (status, vencimiento, conexiones) con cache TTL y revisión masiva concurrente
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+from catalog_cache import CatalogCache
+
+STATUS_ENTRY_BYTES = 512  # tamaño aproximado de una entrada para el presupuesto del cache
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def probe_account(client, dominio_puerto, usuario, password, timeout=10):
+    """Consulta player_api.php sin acción y resume user_info (nunca lanza: el error va en 'error')"""
+    result = {"status": None, "exp_date": None, "active_cons": None, "max_connections": None,
+              "error": None, "checked_at": time.time()}
+    try:
+        api_url = f"http://{dominio_puerto}/player_api.php?username={usuario}&password={password}"
+        res = client.account_info(api_url, timeout=timeout)
+        if res.status_code != 200:
+            result["error"] = f"HTTP {res.status_code}"
+            return result
+        user_info = res.json().get('user_info', {})
+    except Exception as e:
+        result["error"] = str(e) or type(e).__name__
+        return result
+    exp_date = user_info.get('exp_date')
+    result.update(
+        status=user_info.get('status', 'Desconocido'),
+        exp_date=_to_int(exp_date) if exp_date and str(exp_date) != 'null' else None,
+        active_cons=_to_int(user_info.get('active_cons', 0)),
+        max_connections=_to_int(user_info.get('max_connections')),
+    )
+    return result
+
+
+def problems(result, now=None):
+    """Motivos por los que una cuenta requiere atención"""
+    now = now or time.time()
+    found = []
+    if result["error"]:
+        found.append("sin respuesta")
+        return found
+    if result["exp_date"] is not None and result["exp_date"] < now:
+        found.append("vencida")
+    if result["status"] != "Active":
+        found.append("inactiva")
+    if result["max_connections"] and (result["active_cons"] or 0) >= result["max_connections"]:
+        found.append("al límite")
+    return found
+
+
+class AccountStatusChecker:
+    """Sondeos cacheados por cuenta; la revisión masiva reparte los workers entre hosts (per_host)"""
+
+    def __init__(self, client, ttl=300, timeout=10, workers=16, per_host=4, max_entries=20000):
+        self.client = client
+        self.timeout = timeout
+        self.workers = workers
+        self.per_host = per_host
+        self.cache = CatalogCache(ttl=ttl, max_bytes=max_entries * STATUS_ENTRY_BYTES)
+
+    def host(self, conn):
+        return str(conn.get('dominio:puerto', '')).lower()
+
+    def key(self, conn):
+        return f"{self.host(conn)}|{conn.get('usuario_iptv', '')}"
+
+    def check(self, conn, force=False):
+        """Estado de una conexión (dict de la Hoja 2), desde cache si es reciente"""
+        key = self.key(conn)
+        if not force:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        def load():
+            result = probe_account(self.client, conn.get('dominio:puerto', ''), conn.get('usuario_iptv', ''),
+                                   conn.get('password_iptv', ''), self.timeout)
+            self.cache.put(key, result, STATUS_ENTRY_BYTES)
+            return result
+        # Dos admins mirando la misma cuenta comparten el sondeo
+        return self.cache.flight.do(key, load)
+
+    def sweep(self, conexiones, progress=None, force=False):
+        """Revisa todas las conexiones en paralelo; progress(hechas, total) tras cada una.
+
+        Cada sondeo se encola solo cuando su host tiene turno (como mucho per_host en vuelo),
+        así un panel lento no deja a todos los workers esperando por él.
+        """
+        results = [None] * len(conexiones)
+        queues = {}
+        for i, conn in enumerate(conexiones):
+            queues.setdefault(self.host(conn), deque()).append(i)
+        busy = Counter()
+        ready = deque(queues)  # hosts con pendientes y turno libre (turnándose)
+        pending = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            done = 0
+            while True:
+                while ready and len(pending) < self.workers:
+                    host = ready.popleft()
+                    if not queues[host] or busy[host] >= self.per_host:
+                        continue
+                    i = queues[host].popleft()
+                    busy[host] += 1
+                    pending[pool.submit(self.check, conexiones[i], force)] = (i, host)
+                    if queues[host] and busy[host] < self.per_host:
+                        ready.append(host)
+                if not pending:
+                    break
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    i, host = pending.pop(future)
+                    results[i] = future.result()
+                    busy[host] -= 1
+                    if queues[host]:
+                        ready.append(host)
+                    done += 1
+                    if progress:
+                        progress(done, len(conexiones))
+        return results
+
+
+def format_exp(exp_date):
+    if exp_date is None:
+        return "Indefinido"
+    try:
+        return datetime.fromtimestamp(exp_date).strftime('%d/%m/%Y')
+    except (OverflowError, OSError, ValueError):
+        return "N/A"
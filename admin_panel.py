@@ -1,8 +1,13 @@
 import streamlit as st
 import pandas as pd
-import gspread
-import requests
-from oauth2client.service_account import ServiceAccountCredentials
+from xtream_client import XtreamClient
+from ip_match import IPMatcher
+from client_ip import server_client_ip
+from storage import open_storage
+from connection_mirror import ConnectionMirror
+from account_status import AccountStatusChecker, format_exp, problems
+from quota import ADMIN, QuotaScheduler
+from settings import get_setting
 from datetime import datetime
 import time
 from streamlit_javascript import st_javascript
@@ -78,39 +83,6 @@ st.markdown("""
         vertical-align: middle;
     }
     
-    /* CONEXIÓN ROW */
-    .conexion-row {
-        background-color: rgba(30, 30, 30, 0.95);
-        border: 1px solid #333;
-        border-radius: 8px;
-        padding: 15px;
-        margin-bottom: 10px;
-    }
-    .conexion-row:hover {
-        border-color: #00C6FF;
-        box-shadow: 0 0 15px rgba(0, 198, 255, 0.2);
-    }
-    .conexion-field {
-        display: flex;
-        align-items: center;
-        margin-bottom: 8px;
-        font-size: 13px;
-    }
-    .conexion-label {
-        color: #00C6FF;
-        font-weight: 600;
-        min-width: 150px;
-    }
-    .conexion-value {
-        color: white;
-        background-color: rgba(0, 198, 255, 0.1);
-        padding: 6px 12px;
-        border-radius: 4px;
-        flex-grow: 1;
-        font-family: monospace;
-        word-break: break-all;
-    }
-    
     /* INFO PANEL */
     .info-panel {
         background-color: rgba(20, 20, 20, 0.95);
@@ -153,45 +125,66 @@ if 'ip_loading' not in st.session_state:
     st.session_state.ip_loading = True
 if 'selected_connection_detail' not in st.session_state:
     st.session_state.selected_connection_detail = None
+# Tabla de conexiones: página actual, filtro que la originó y versión de la selección
+if 'conn_page' not in st.session_state:
+    st.session_state.conn_page = 1
+if 'conn_view_key' not in st.session_state:
+    st.session_state.conn_view_key = None
+if 'conn_table_nonce' not in st.session_state:
+    st.session_state.conn_table_nonce = 0
+if 'conn_table_selection' not in st.session_state:
+    st.session_state.conn_table_selection = None
+if 'sweep_results' not in st.session_state:
+    st.session_state.sweep_results = None
 
 # --- FUNCIONES ---
-def connect_db():
-    """Conecta a Google Sheets HOJA 1 (Usuarios)"""
-    try:
-        scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-        creds_dict = dict(st.secrets["gcp_service_account"])
-        creds_dict["private_key"] = creds_dict["private_key"].replace("\\n", "\n")
-        
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-        client = gspread.authorize(creds)
-        sheet = client.open_by_url(SHEET_URL).sheet1
-        return sheet
-    except Exception as e:
-        st.error(f"Error Sheets: {e}")
-        st.stop()
+@st.cache_resource
+def get_storage():
+    """Usuarios (Hoja 1) y conexiones (Hoja 2): Google Sheets o SQLite local según [storage] backend"""
+    backend = get_setting("backend", "sheets", section="storage")
+    return open_storage(
+        backend,
+        sheet_url=SHEET_URL,
+        credentials=st.secrets["gcp_service_account"] if backend != 'sqlite' else None,
+        path=get_setting("path", None, section="storage"),
+        scheduler=QuotaScheduler(
+            reads_per_minute=int(get_setting("reads_per_minute", 60, section="sheets")),
+            writes_per_minute=int(get_setting("writes_per_minute", 60, section="sheets")),
+            merge_window=float(get_setting("merge_window", 2, section="sheets")),
+        ),
+        priority=ADMIN,
+    )
 
-def connect_db_conexiones():
-    """Conecta a Google Sheets HOJA 2 (Conexiones)"""
-    try:
-        scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-        creds_dict = dict(st.secrets["gcp_service_account"])
-        creds_dict["private_key"] = creds_dict["private_key"].replace("\\n", "\n")
-        
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-        client = gspread.authorize(creds)
-        spreadsheet = client.open_by_url(SHEET_URL)
-        
-        try:
-            sheet2 = spreadsheet.get_worksheet(1)
-        except:
-            sheet2 = spreadsheet.add_worksheet(title="Conexiones", rows=100, cols=5)
-        
-        return sheet2
-    except:
-        return None
+@st.cache_resource
+def get_connection_mirror():
+    """Espejo local de la Hoja 2 que se actualiza leyendo solo las filas nuevas"""
+    return ConnectionMirror(
+        get_storage(),
+        get_setting("mirror_path", ".connections_mirror.sqlite3", section="connections"),
+        min_interval=int(get_setting("mirror_refresh", 10, section="connections")),
+    )
+
+@st.cache_resource
+def get_xtream_client():
+    """Cliente Xtream compartido (sesiones keep-alive por host, gzip, reintentos)"""
+    # max_per_host acota los sondeos simultáneos contra un mismo panel
+    client = XtreamClient(retries=1, max_per_host=int(get_setting("per_host", 4, section="status")))
+    for group in get_setting("mirrors", [], section="xtream"):
+        client.register_mirrors(group)
+    return client
+
+@st.cache_resource
+def get_status_checker():
+    """Estado de cuentas IPTV cacheado [status] ttl segundos; revisión masiva con [status] workers hilos"""
+    return AccountStatusChecker(
+        get_xtream_client(),
+        ttl=int(get_setting("ttl", 300, section="status")),
+        workers=int(get_setting("workers", 16, section="status")),
+        per_host=int(get_setting("per_host", 4, section="status")),
+    )
 
 def get_my_ip():
-    """Detecta IP Real del cliente via JavaScript"""
+    """Detecta IP Real del cliente via JavaScript (respaldo si el servidor no la puede resolver)"""
     try:
         url = 'https://api.ipify.org'
         ip_js = st_javascript(f"await fetch('{url}').then(r => r.text())")
@@ -201,26 +194,224 @@ def get_my_ip():
     except: 
         return None
 
+IP_HELP = "IPs, redes CIDR (181.50.0.0/16, 2800:200::/32) o rangos (10.0.0.5-10.0.0.90), separados por coma"
+
+def warn_invalid_ips(value):
+    """Avisa de entradas que no son IP, CIDR ni rango (solo coincidirían como texto exacto)"""
+    invalid = IPMatcher.compile(value).invalid
+    if invalid:
+        st.warning(f"⚠️ Entradas no reconocidas: {', '.join(invalid)}")
+
+@st.cache_resource
+def compile_admin_ips(admin_ips_str):
+    """admin_ips compilado (IPs, CIDR y rangos); se recompila solo si cambia el texto"""
+    return IPMatcher.compile(admin_ips_str)
+
 def check_ip_is_admin(ip):
     """Verifica si la IP está en la lista de IPs admin"""
     try:
         admin_ips_str = st.secrets["general"]["admin_ips"]
-        admin_ips = [ip.strip() for ip in admin_ips_str.split(',')]
-        return ip in admin_ips
+        return ip in compile_admin_ips(admin_ips_str)
     except:
         return False
 
+CONNECTION_COLUMNS = {
+    'username_login': "👤 Username Login",
+    'usuario_iptv': "📱 Usuario IPTV",
+    'password_iptv': "🔐 Password IPTV",
+    'dominio:puerto': "🌐 Dominio:Puerto",
+    'timestamp': "📅 Timestamp",
+}
+CONNECTION_SORTS = {
+    "Orden de registro": (None, False),
+    "Más recientes": ('timestamp', True),
+    "Más antiguas": ('timestamp', False),
+    "Username Login": ('username_login', False),
+    "Usuario IPTV": ('usuario_iptv', False),
+    "Dominio:Puerto": ('dominio:puerto', False),
+}
+SEARCH_FIELDS = ('username_login', 'usuario_iptv', 'dominio:puerto')
+
+def filter_connections(conexiones, query, sort):
+    """Búsqueda (username_login, usuario_iptv, dominio:puerto) y orden en el servidor"""
+    query = query.strip().lower()
+    if query:
+        conexiones = [c for c in conexiones if any(query in str(c.get(f, '')).lower() for f in SEARCH_FIELDS)]
+    field, reverse = CONNECTION_SORTS[sort]
+    if field:
+        conexiones = sorted(conexiones, key=lambda c: str(c.get(field, '')).lower(), reverse=reverse)
+    return conexiones
+
+def close_connection_detail():
+    st.session_state.selected_connection_detail = None
+    # Tabla nueva = selección vacía
+    st.session_state.conn_table_nonce += 1
+
+def render_connection_detail(conn_sel):
+    """Panel con estado, vencimiento y conexiones de la cuenta IPTV seleccionada"""
+    usuario_iptv = conn_sel.get('usuario_iptv', '')
+    dominio_puerto = conn_sel.get('dominio:puerto', '')
+    
+    # Info de la API (cacheada por cuenta: otros clics del panel no vuelven a consultarla)
+    result = get_status_checker().check(conn_sel, force=st.session_state.pop('force_status_check', False))
+    
+    if result['error']:
+        st.warning(f"⚠️ No se pudo obtener info de la API ({result['error']})")
+    else:
+        status = result['status']
+        max_cons = result['max_connections'] if result['max_connections'] is not None else '?'
+        
+        # Color estado
+        color_estado = "#00FF00" if status == "Active" else "#FF6B6B"
+        
+        # Renderizar panel
+        st.markdown(f"""
+        <div class="info-panel">
+            <div class="info-field">
+                <div class="info-label">📱 Usuario IPTV</div>
+                <div class="info-value">{usuario_iptv} @ {dominio_puerto}</div>
+            </div>
+            <div class="info-field">
+                <div class="info-label">📊 Estado</div>
+                <div class="info-value" style="color:{color_estado};">🟢 {status}</div>
+            </div>
+            <div class="info-field">
+                <div class="info-label">📆 Vencimiento</div>
+                <div class="info-value">{format_exp(result['exp_date'])}</div>
+            </div>
+            <div class="info-field">
+                <div class="info-label">🔗 Conexiones</div>
+                <div class="info-value">{result['active_cons'] or 0}/{max_cons}</div>
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+    st.caption(f"Consultado hace {int(time.time() - result['checked_at'])} s")
+    
+    c_refresh, c_close = st.columns(2)
+    c_refresh.button("🔄 Consultar de nuevo", use_container_width=True,
+                     on_click=lambda: st.session_state.update(force_status_check=True))
+    # Botón para cerrar
+    c_close.button("✕ Cerrar", use_container_width=True, on_click=close_connection_detail)
+
+SWEEP_COLUMNS = ["Problemas", "Usuario IPTV", "Dominio:Puerto", "Username Login", "Estado", "Vence", "Conexiones", "Error"]
+
+@st.fragment
+def status_sweep_view(conexiones_unicas):
+    """Revisión de todas las cuentas en paralelo: vencidas, inactivas o al límite de conexiones"""
+    with st.expander("🩺 Revisar estado de todas las cuentas", expanded=st.session_state.sweep_results is not None):
+        c_btn, c_force, c_only = st.columns([1, 1, 1])
+        run = c_btn.button(f"Revisar {len(conexiones_unicas)} cuentas", use_container_width=True)
+        force = c_force.checkbox("Ignorar cache", help="Volver a consultar aunque haya un resultado reciente")
+        only_problems = c_only.checkbox("Solo con problemas", value=True)
+        
+        if run:
+            bar = st.progress(0.0, text="Consultando paneles...")
+            started = time.time()
+            
+            def progress(done, total):
+                bar.progress(done / total, text=f"Consultando paneles... {done}/{total}")
+            
+            results = get_status_checker().sweep(conexiones_unicas, progress=progress, force=force)
+            now = time.time()
+            st.session_state.sweep_results = [
+                {
+                    "Problemas": ", ".join(problems(r, now)),
+                    "Usuario IPTV": conn.get('usuario_iptv', ''),
+                    "Dominio:Puerto": conn.get('dominio:puerto', ''),
+                    "Username Login": conn.get('username_login', ''),
+                    "Estado": r['status'] or '',
+                    "Vence": datetime.fromtimestamp(r['exp_date']) if r['exp_date'] else None,
+                    "Conexiones": f"{r['active_cons'] or 0}/{r['max_connections'] if r['max_connections'] is not None else '?'}",
+                    "Error": r['error'] or '',
+                }
+                for conn, r in zip(conexiones_unicas, results)
+            ]
+            bar.progress(1.0, text=f"✅ {len(results)} cuentas revisadas en {now - started:.1f} s")
+        
+        if st.session_state.sweep_results is not None:
+            rows = st.session_state.sweep_results
+            flagged = [r for r in rows if r["Problemas"]]
+            st.caption(f"{len(flagged)} de {len(rows)} cuentas con problemas · "
+                       f"vencidas {sum('vencida' in r['Problemas'] for r in rows)} · "
+                       f"inactivas {sum('inactiva' in r['Problemas'] for r in rows)} · "
+                       f"al límite {sum('al límite' in r['Problemas'] for r in rows)} · "
+                       f"sin respuesta {sum('sin respuesta' in r['Problemas'] for r in rows)}")
+            table = pd.DataFrame(flagged if only_problems else rows, columns=SWEEP_COLUMNS)
+            st.dataframe(
+                table, use_container_width=True, hide_index=True,
+                column_config={"Vence": st.column_config.DatetimeColumn("Vence", format="DD/MM/YYYY")},
+            )
+
+@st.fragment
+def connections_view(conexiones_unicas):
+    """Tabla paginada de conexiones: solo se renderiza la página visible"""
+    c_busq, c_orden, c_tam = st.columns([2, 1, 1])
+    query = c_busq.text_input("🔍 Buscar", placeholder="Username login, usuario IPTV o dominio:puerto")
+    sort = c_orden.selectbox("Ordenar por", list(CONNECTION_SORTS))
+    page_size = c_tam.selectbox("Filas por página", [25, 50, 100, 250], index=1)
+    
+    filtered = filter_connections(conexiones_unicas, query, sort)
+    total = len(filtered)
+    pages = max(1, -(-total // page_size))
+    if st.session_state.conn_view_key != (query, sort, page_size):
+        # Búsqueda u orden nuevos: volver a la primera página
+        st.session_state.conn_view_key = (query, sort, page_size)
+        st.session_state.conn_page = 1
+    st.session_state.conn_page = min(st.session_state.conn_page, pages)
+    start = (st.session_state.conn_page - 1) * page_size
+    page_rows = filtered[start:start + page_size]
+    
+    col_list, col_info = st.columns([1.5, 1])
+    
+    with col_list:
+        st.markdown("**📊 Lista de Conexiones:**")
+        if not page_rows:
+            st.warning("Sin resultados para esa búsqueda.")
+        else:
+            table = pd.DataFrame([{label: c.get(field, 'N/A') for field, label in CONNECTION_COLUMNS.items()} for c in page_rows])
+            # La cantidad de filas del espejo va en la key: si llegan filas nuevas la tabla es otra
+            table_key = (f"conn_table_{st.session_state.conn_table_nonce}_{len(conexiones_unicas)}_"
+                         f"{st.session_state.conn_page}_{hash(st.session_state.conn_view_key)}")
+            event = st.dataframe(
+                table, use_container_width=True, hide_index=True,
+                on_select="rerun", selection_mode="single-row", key=table_key,
+            )
+            selected = (table_key, event.selection.rows[0]) if event.selection.rows else None
+            # Solo cuando cambia la selección (en otros reruns la fila puede ser otra o no existir)
+            if selected and selected != st.session_state.conn_table_selection and selected[1] < len(page_rows):
+                st.session_state.selected_connection_detail = page_rows[selected[1]]
+            st.session_state.conn_table_selection = selected
+        
+        if pages > 1:
+            col1, col2 = st.columns([1, 2])
+            col1.number_input("Página", min_value=1, max_value=pages, key="conn_page")
+            col2.caption(f"Conexiones {start + 1}–{start + len(page_rows)} de {total} · página {st.session_state.conn_page} de {pages}")
+    
+    with col_info:
+        st.markdown("**ℹ️ Detalles:**")
+        
+        if st.session_state.selected_connection_detail:
+            render_connection_detail(st.session_state.selected_connection_detail)
+        else:
+            st.caption("Selecciona una fila de la tabla para ver el estado de la cuenta.")
+
 
 # --- INTERFAZ ---
 st.markdown("<h1 style='text-align:center; color:#00C6FF;'>⚙️ PANEL MAESTRO</h1>", unsafe_allow_html=True)
 
 # 1. DETECCIÓN DE IP
 if st.session_state.user_ip is None and st.session_state.ip_loading:
-    ip = get_my_ip()
-    if ip: 
+    # Primero desde la propia conexión (sin llamada externa ni rerun); JS solo como respaldo
+    ip = server_client_ip()
+    if ip:
         st.session_state.user_ip = ip
         st.session_state.ip_loading = False
-        st.rerun()
+    else:
+        ip = get_my_ip()
+        if ip: 
+            st.session_state.user_ip = ip
+            st.session_state.ip_loading = False
+            st.rerun()
 
 # 2. LOGIN POR IP
 if not st.session_state.admin_ok:
@@ -247,10 +438,20 @@ if not st.session_state.admin_ok:
 st.markdown(f'<div class="admin-badge">🔐 ADMIN MODE - IP: {st.session_state.user_ip}</div>', unsafe_allow_html=True)
 
 # 4. CARGAR DATOS
-sheet = connect_db()
-df = pd.DataFrame(sheet.get_all_records())
+try:
+    storage = get_storage()
+    df = pd.DataFrame(storage.list_users())
+except Exception as e:
+    st.error(f"Error Sheets: {e}")
+    st.stop()
 
 st.info(f"Usuarios activos: {len(df)}")
+if getattr(storage, 'scheduler', None):
+    # Estado de la cuota de Sheets de este proceso
+    q = storage.scheduler.stats()
+    st.caption(f"Sheets · cola lectura {q['read_queued']} / escritura {q['write_queued']} · "
+               f"espera media {q['read_wait_avg']}s (máx {q['read_wait_max']}s) · "
+               f"limitadas {q['read_throttled'] + q['write_throttled']} · fusionadas {q['merged']} · 429: {q['quota_errors']}")
 
 # TABS
 tab1, tab2, tab3 = st.tabs(["📝 Gestionar", "➕ Nuevo Usuario", "📊 Conexiones"])
@@ -263,24 +464,22 @@ with tab1:
         user_select = st.selectbox("Seleccionar Usuario para Editar/Borrar:", df['username'].tolist())
         
         if user_select:
-            cell = sheet.find(user_select)
-            row_idx = cell.row
             user_data = df[df['username'] == user_select].iloc[0]
             
             with st.form("edit"):
                 st.write(f"Editando a: **{user_select}**")
-                n_ip = st.text_input("IP", value=user_data['allowed_ip'])
+                n_ip = st.text_input("IP", value=user_data['allowed_ip'], help=IP_HELP)
                 n_nota = st.text_input("Nota", value=user_data.get('notas', ''))
                 
                 if st.form_submit_button("💾 Guardar Cambios"):
-                    sheet.update_cell(row_idx, 2, n_ip)
-                    sheet.update_cell(row_idx, 3, n_nota)
+                    warn_invalid_ips(n_ip)
+                    storage.update_user(user_select, n_ip, n_nota)
                     st.success("✅ Actualizado.")
                     time.sleep(1)
                     st.rerun()
             
             if st.button("🗑️ Eliminar Usuario Permanentemente"):
-                sheet.delete_rows(row_idx)
+                storage.delete_user(user_select)
                 st.warning("⚠️ Eliminado.")
                 time.sleep(1)
                 st.rerun()
@@ -295,7 +494,7 @@ with tab2:
     with st.form("add"):
         c1, c2 = st.columns(2)
         u = c1.text_input("Usuario")
-        i = c2.text_input("IP Permitida")
+        i = c2.text_input("IP Permitida", help=IP_HELP)
         n = st.text_input("Notas (Cliente)")
         
         if st.form_submit_button("✅ Crear Usuario"):
@@ -303,7 +502,8 @@ with tab2:
                 if not df.empty and u in df['username'].values:
                     st.error("❌ El usuario ya existe.")
                 else:
-                    sheet.append_row([u, i, n])
+                    warn_invalid_ips(i)
+                    storage.add_user(u, i, n)
                     st.success(f"✅ Usuario '{u}' creado correctamente.")
                     time.sleep(1)
                     st.rerun()
@@ -314,144 +514,25 @@ with tab2:
 with tab3:
     st.markdown("<h3>📊 Conexiones Registradas (Hoja 2)</h3>", unsafe_allow_html=True)
     
-    sheet2 = connect_db_conexiones()
+    mirror = get_connection_mirror()
+    try:
+        # Solo las filas nuevas desde la última lectura
+        mirror.refresh(force=st.button("🔄 Actualizar conexiones"))
+        ok = True
+    except Exception as e:
+        ok = False
+        st.error(f"Error Sheets: {e}")
     
-    if sheet2:
-        conexiones = sheet2.get_all_records()
+    if ok or mirror.count:
         
-        if not conexiones:
+        if not mirror.count:
             st.warning("⚠️ No hay conexiones registradas aún.")
         else:
-            # DEDUPLICAR por usuario_iptv (mantener primera aparición)
-            seen = set()
-            conexiones_unicas = []
-            for conn in conexiones:
-                usuario = conn.get('usuario_iptv', '')
-                if usuario and usuario not in seen:
-                    seen.add(usuario)
-                    conexiones_unicas.append(conn)
-            
-            st.info(f"Total de conexiones únicas: {len(conexiones_unicas)}")
+            # DEDUPLICADAS por usuario_iptv (primera aparición), mantenido por el espejo
+            conexiones_unicas = mirror.unique()
             
-            col_list, col_info = st.columns([1.5, 1])
-            
-            with col_list:
-                st.markdown("**📊 Lista de Conexiones:**")
-                
-                # Listar conexiones
-                for idx, conn in enumerate(conexiones_unicas):
-                    username_login = conn.get('username_login', 'N/A')
-                    usuario_iptv = conn.get('usuario_iptv', 'N/A')
-                    password_iptv = conn.get('password_iptv', 'N/A')
-                    dominio_puerto = conn.get('dominio:puerto', 'N/A')
-                    timestamp = conn.get('timestamp', 'N/A')
-                    
-                    # Layout: datos + botón info
-                    col_data, col_btn = st.columns([4, 1])
-                    
-                    with col_data:
-                        html_conn = f"""
-                        <div class="conexion-row">
-                            <div class="conexion-field">
-                                <span class="conexion-label">👤 Username Login:</span>
-                                <span class="conexion-value">{username_login}</span>
-                            </div>
-                            <div class="conexion-field">
-                                <span class="conexion-label">📱 Usuario IPTV:</span>
-                                <span class="conexion-value">{usuario_iptv}</span>
-                            </div>
-                            <div class="conexion-field">
-                                <span class="conexion-label">🔐 Password IPTV:</span>
-                                <span class="conexion-value">{password_iptv}</span>
-                            </div>
-                            <div class="conexion-field">
-                                <span class="conexion-label">🌐 Dominio:Puerto:</span>
-                                <span class="conexion-value">{dominio_puerto}</span>
-                            </div>
-                            <div class="conexion-field">
-                                <span class="conexion-label">📅 Timestamp:</span>
-                                <span class="conexion-value">{timestamp}</span>
-                            </div>
-                        </div>
-                        """
-                        st.markdown(html_conn, unsafe_allow_html=True)
-                    
-                    with col_btn:
-                        # Botón ℹ️ para ver detalles
-                        if st.button("ℹ️", key=f"info_btn_{idx}", help="Ver detalles"):
-                            st.session_state.selected_connection_detail = conn
-                            st.rerun()
-            
-            with col_info:
-                st.markdown("**ℹ️ Detalles:**")
-                
-                if st.session_state.selected_connection_detail:
-                    conn_sel = st.session_state.selected_connection_detail
-                    
-                    # Obtener datos de la API (info del usuario IPTV)
-                    usuario_iptv = conn_sel.get('usuario_iptv', '')
-                    password_iptv = conn_sel.get('password_iptv', '')
-                    dominio_puerto = conn_sel.get('dominio:puerto', '')
-                    
-                    # Construir URL de API
-                    try:
-                        api_url = f"http://{dominio_puerto}/player_api.php?username={usuario_iptv}&password={password_iptv}"
-                        
-                        headers = {"User-Agent": "Mozilla/5.0"}
-                        res = requests.get(api_url, headers=headers, timeout=10)
-                        
-                        if res.status_code == 200:
-                            data = res.json()
-                            user_info = data.get('user_info', {})
-                            
-                            # Extraer información
-                            status = user_info.get('status', 'Desconocido')
-                            exp_date = user_info.get('exp_date')
-                            active_cons = user_info.get('active_cons', '0')
-                            max_cons = user_info.get('max_connections', '?')
-                            
-                            # Formatear fecha
-                            if exp_date and str(exp_date) != 'null':
-                                try:
-                                    exp_formatted = datetime.fromtimestamp(int(exp_date)).strftime('%d/%m/%Y')
-                                except:
-                                    exp_formatted = "N/A"
-                            else:
-                                exp_formatted = "Indefinido"
-                            
-                            # Color estado
-                            color_estado = "#00FF00" if status == "Active" else "#FF6B6B"
-                            
-                            # Renderizar panel
-                            st.markdown(f"""
-                            <div class="info-panel">
-                                <div class="info-field">
-                                    <div class="info-label">📊 Estado</div>
-                                    <div class="info-value" style="color:{color_estado};">🟢 {status}</div>
-                                </div>
-                                <div class="info-field">
-                                    <div class="info-label">📆 Vencimiento</div>
-                                    <div class="info-value">{exp_formatted}</div>
-                                </div>
-                                <div class="info-field">
-                                    <div class="info-label">🔗 Conexiones</div>
-                                    <div class="info-value">{active_cons}/{max_cons}</div>
-                                </div>
-                            </div>
-                            """, unsafe_allow_html=True)
-                        else:
-                            st.warning("⚠️ No se pudo obtener info de la API")
-                    except Exception as e:
-                        st.warning(f"⚠️ Error conectando: {str(e)}")
-                    
-                    # Botón para cerrar
-                    if st.button("✕ Cerrar", use_container_width=True):
-                        st.session_state.selected_connection_detail = None
-                        st.rerun()
-                else:
-                    st.markdown("<p style='color:#aaa; text-align:center; margin-top:30px;'>👆 Haz clic en ℹ️<br>para ver detalles</p>", unsafe_allow_html=True)
+            st.info(f"Total de conexiones únicas: {len(conexiones_unicas)} (de {mirror.count} registros)")
+            status_sweep_view(conexiones_unicas)
+            connections_view(conexiones_unicas)
     else:
         st.error("❌ Error al conectar con Hoja 2")
-
-
-
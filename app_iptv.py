@@ -1,12 +1,25 @@
 import streamlit as st
-import requests
 import hashlib
-import time
-from oauth2client.service_account import ServiceAccountCredentials
+import json
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
 from urllib.parse import urlparse, parse_qs
 from datetime import datetime
 from streamlit_javascript import st_javascript
-import gspread
+from catalog import Catalog, CrossSearch, iter_catalog_stream
+from catalog_cache import CatalogCache, account_key, log_stats
+from client_ip import server_client_ip
+from connection_log import ConnectionLog
+from image_proxy import PosterCache, PosterProxy
+from quota import LOGIN, QuotaScheduler
+from render import render_channel_rows, render_vod_grid
+from snapshots import SnapshotStore
+from storage import open_storage
+from user_directory import UserDirectory
+from xtream_client import XtreamClient
+from settings import get_setting
 
 # 1. CONFIGURACIÓN DE PÁGINA
 st.set_page_config(page_title="Buscador PRO", layout="wide", page_icon="📺")
@@ -132,29 +145,46 @@ if 'ip_loading' not in st.session_state: st.session_state.ip_loading = True
 if 'data_live' not in st.session_state: st.session_state.data_live = None
 if 'data_vod' not in st.session_state: st.session_state.data_vod = None
 if 'data_series' not in st.session_state: st.session_state.data_series = None
+# Descargas en segundo plano por modo
+if 'pending_fetch' not in st.session_state: st.session_state.pending_fetch = {}
 # Contador de items mostrados
 if 'vod_display_count' not in st.session_state: st.session_state.vod_display_count = 60
 if 'series_display_count' not in st.session_state: st.session_state.series_display_count = 60
+# Ventana visible de la lista de canales
+if 'live_page' not in st.session_state: st.session_state.live_page = 1
+if 'live_window_key' not in st.session_state: st.session_state.live_window_key = None
 
 
 # 3. FUNCIONES
 
-@st.cache_data(ttl=60) 
+@st.cache_resource
+def get_storage():
+    """Usuarios y conexiones: Google Sheets o SQLite local según [storage] backend"""
+    backend = get_setting("backend", "sheets", section="storage")
+    return open_storage(
+        backend,
+        sheet_url=SHEET_URL,
+        credentials=st.secrets["gcp_service_account"] if backend != 'sqlite' else None,
+        path=get_setting("path", None, section="storage"),
+        scheduler=QuotaScheduler(
+            reads_per_minute=int(get_setting("reads_per_minute", 60, section="sheets")),
+            writes_per_minute=int(get_setting("writes_per_minute", 60, section="sheets")),
+            merge_window=float(get_setting("merge_window", 2, section="sheets")),
+        ),
+        priority=LOGIN,
+    )
+
 def get_users_from_cloud():
-    """Descarga usuarios de Google Sheets"""
-    try:
-        scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-        creds_dict = dict(st.secrets["gcp_service_account"])
-        creds_dict["private_key"] = creds_dict["private_key"].replace("\\n", "\n")
-        
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-        client = gspread.authorize(creds)
-        sheet = client.open_by_url(SHEET_URL).sheet1
-        return sheet.get_all_records()
-    except: return []
+    """Descarga usuarios (Sheet1 o tabla local)"""
+    return get_storage().list_users()
+
+@st.cache_resource
+def get_user_directory():
+    """Índice username -> IPs permitidas, refrescado en segundo plano cada [users] ttl segundos"""
+    return UserDirectory(get_users_from_cloud, ttl=int(get_setting("ttl", 60, section="users")))
 
 def get_my_ip():
-    """Detecta IP Real via JS"""
+    """Detecta IP Real via JS (respaldo si el servidor no la puede resolver)"""
     try:
         url = 'https://api.ipify.org'
         ip_js = st_javascript(f"await fetch('{url}').then(r => r.text())")
@@ -163,37 +193,267 @@ def get_my_ip():
         return None
     except: return None
 
+@st.cache_resource
+def get_connection_log():
+    """Cola de conexiones pendientes de volcar en Sheet2 (spool local + lotes en segundo plano)"""
+    storage = get_storage()
+    return ConnectionLog(
+        storage.append_connections,
+        get_setting("spool_path", ".connection_spool.sqlite3", section="connections"),
+        flush_interval=int(get_setting("flush_interval", 10, section="connections")),
+        batch_size=int(get_setting("batch_size", 100, section="connections")),
+    )
+
 def save_connection_data(username_login, username_iptv, password_iptv, domain_port):
-    """Guarda datos en Sheet2 del Google Sheets"""
+    """Encola la conexión para Sheet2 (se escribe en lote en segundo plano)"""
     try:
-        scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-        creds_dict = dict(st.secrets["gcp_service_account"])
-        creds_dict["private_key"] = creds_dict["private_key"].replace("\\n", "\n")
-        
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-        client = gspread.authorize(creds)
-        spreadsheet = client.open_by_url(SHEET_URL)
-        
-        # Acceder a Sheet2
-        try:
-            sheet2 = spreadsheet.get_worksheet(1)  # Index 1 = Sheet2
-        except:
-            # Si no existe, crearla
-            sheet2 = spreadsheet.add_worksheet(title="Conexiones", rows=100, cols=5)
-        
-        # Agregar header si está vacía
-        if not sheet2.get_all_records():
-            sheet2.append_row(["timestamp", "username_login", "usuario_iptv", "password_iptv", "dominio:puerto"])
-        
-        # Agregar datos
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        sheet2.append_row([timestamp, username_login, username_iptv, password_iptv, domain_port])
-        
+        get_connection_log().record([timestamp, username_login, username_iptv, password_iptv, domain_port])
         return True
     except Exception as e:
         print(f"Error guardando conexión: {e}")
         return False
 
+@st.cache_resource
+def get_catalog_cache():
+    """Cache de catálogos compartido entre todas las sesiones"""
+    cache = CatalogCache(
+        ttl=int(get_setting("catalog_ttl", 900, section="cache")),
+        max_bytes=int(get_setting("catalog_max_mb", 512, section="cache")) * 1024 * 1024,
+    )
+    log_cache_stats(cache, "catálogos")
+    return cache
+
+def log_cache_stats(cache, label):
+    """Aciertos, desalojos y cargas compartidas en el log cada [cache] stats_interval s (0 = nunca)"""
+    interval = int(get_setting("stats_interval", 300, section="cache"))
+    if interval > 0:
+        log_stats(cache, label, interval)
+
+@st.cache_resource
+def get_xtream_client():
+    """Cliente Xtream compartido (sesiones keep-alive por host, gzip, reintentos)"""
+    client = XtreamClient(
+        max_per_host=int(get_setting("max_per_host", 4, section="xtream")),
+        retries=int(get_setting("retries", 2, section="xtream")),
+        hedge_fanout=int(get_setting("hedge_fanout", 2, section="xtream")),
+    )
+    # Espejos: listas de dominio:puerto que sirven el mismo panel, p.ej. [["a.tv:8080", "b.tv:80"]]
+    for group in get_setting("mirrors", [], section="xtream"):
+        client.register_mirrors(group)
+    return client
+
+@st.cache_resource
+def get_snapshot_store():
+    """Snapshots de catálogos en disco (None si [cache] snapshot_path está vacío)"""
+    path = get_setting("snapshot_path", ".catalog_snapshots.sqlite3", section="cache")
+    if not path:
+        return None
+    try:
+        return SnapshotStore(
+            path,
+            max_age=int(get_setting("snapshot_max_age", 6 * 3600, section="cache")),
+            max_bytes=int(get_setting("snapshot_max_mb", 1024, section="cache")) * 1024 * 1024,
+            keep_for=int(get_setting("snapshot_keep_days", 7, section="cache")) * 24 * 3600,
+        )
+    except Exception as e:
+        print(f"Error abriendo snapshots: {e}")
+        return None
+
+@st.cache_resource
+def get_fetch_pool():
+    """Pool de hilos compartido para descargas de catálogos"""
+    return ThreadPoolExecutor(max_workers=int(get_setting("fetch_workers", 16, section="cache")))
+
+# Acciones de player_api.php por modo: (contenido, categorías)
+MODE_ACTIONS = {
+    'live': ('get_live_streams', 'get_live_categories'),
+    'vod': ('get_vod_streams', 'get_vod_categories'),
+    'series': ('get_series', 'get_series_categories'),
+}
+CHANNEL_WINDOW = 100  # filas de canales renderizadas a la vez
+MODE_LABELS = {'live': "📡 TV EN VIVO", 'vod': "🎥 PELÍCULAS", 'series': "📺 SERIES"}
+
+@contextmanager
+def stream_catalog_items(api, action):
+    """Items (campos proyectados) de una acción de catálogo, parseados a medida que llegan"""
+    with xtream.stream_action(api, action) as res:
+        yield iter_catalog_stream(res.iter_content(chunk_size=64 * 1024))
+
+def download_action(api, action, stream=False):
+    """Descarga y parsea una acción de player_api.php"""
+    if stream:
+        # Catálogos grandes: parseo incremental directo a un Catalog en columnas
+        with stream_catalog_items(api, action) as items:
+            return Catalog(items)
+    return xtream.get_action(api, action).json()
+
+def remember_action(cache, key, data):
+    """Guarda en el cache compartido (y arma el índice de búsqueda en segundo plano)"""
+    if isinstance(data, Catalog):
+        cache.put(key, data, data.nbytes())
+
+        def index():
+            data.build_search_index()
+            # Solo si sigue siendo el vigente: un refresco pudo guardar uno más nuevo mientras tanto
+            if cache.peek(key) is data:
+                cache.put(key, data, data.nbytes())
+        # Índice de búsqueda en segundo plano; mientras tanto se busca recorriendo la tabla
+        threading.Thread(target=index, daemon=True).start()
+    else:
+        cache.put(key, data, len(json.dumps(data)))
+
+def refresh_action(cache, store, key, api, action, stream=False, current=None):
+    """Vuelve a descargar una acción y actualiza cache y snapshot.
+
+    Si ya hay un Catalog (current) se le aplica solo el delta. Devuelve (datos, cambios).
+    """
+    try:
+        changes = None
+        if stream and isinstance(current, Catalog):
+            with stream_catalog_items(api, action) as items:
+                data, changes = current.apply_delta(items)
+        else:
+            data = download_action(api, action, stream)
+        remember_action(cache, key, data)
+        if store is not None:
+            store.save(*key, data)
+        if changes and (changes["inserted"] or changes["updated"] or changes["deleted"]):
+            print(f"Refresco {action}: {changes}")
+        return data, changes
+    except Exception as e:
+        print(f"Error refrescando {action}: {e}")
+        return None, None
+
+def fetch_action(cache, store, pool, api, username, action, stream=False):
+    """Acción de player_api.php: cache del proceso -> snapshot en disco -> panel (devuelve un Future)"""
+    key = (account_key(api, username), action)
+    data = cache.get(key)
+    if data is not None:
+        done = Future()
+        done.set_result(data)
+        return done
+    # Sesiones que piden lo mismo a la vez comparten el Future de una sola carga (sin ocupar hilos)
+    return cache.flight.submit(pool, key, partial(load_action, cache, store, key, api, action, stream))
+
+def load_action(cache, store, key, api, action, stream=False):
+    """Carga una acción que no estaba en cache (snapshot o panel)"""
+    data = cache.peek(key)
+    if data is not None:
+        # Otra carga idéntica terminó justo antes
+        return data
+    snapshot = store.load(*key) if store is not None else None
+    if snapshot is None:
+        data = download_action(api, action, stream)
+        if store is not None:
+            threading.Thread(target=store.save, args=(*key, data), daemon=True).start()
+    else:
+        data, saved_at = snapshot
+        if store.is_stale(saved_at):
+            # Se usa el snapshot viejo ya mismo y se refresca en segundo plano
+            threading.Thread(
+                target=refresh_action, args=(cache, store, key, api, action, stream, data), daemon=True
+            ).start()
+    remember_action(cache, key, data)
+    return data
+
+def start_fetch(api, username, mode):
+    """Lanza en paralelo la descarga de contenido y categorías de un modo (no bloquea)"""
+    cache = get_catalog_cache()
+    store = get_snapshot_store()
+    pool = get_fetch_pool()
+    action_content, action_cats = MODE_ACTIONS[mode]
+    return (
+        fetch_action(cache, store, pool, api, username, action_content, True),
+        fetch_action(cache, store, pool, api, username, action_cats),
+    )
+
+def get_mode_fetch(mode):
+    """Devuelve la descarga en curso del modo (precargada o nueva)"""
+    futures = st.session_state.pending_fetch.pop(mode, None)
+    if futures is None:
+        iptv = st.session_state.iptv_data
+        futures = start_fetch(iptv['api'], iptv['info'].get('username'), mode)
+    return futures
+
+def fetch_account_info(api):
+    """Petición de login a player_api.php: (status, cuerpo); llamadas idénticas concurrentes se comparten"""
+    def load():
+        res = xtream.account_info(api)
+        return res.status_code, res.content
+    return get_catalog_cache().flight.do(('account_info', api), load)
+
+def refresh_mode(mode):
+    """Refresca contenido (por delta) y categorías del modo; devuelve los cambios del contenido"""
+    iptv = st.session_state.iptv_data
+    api, username = iptv['api'], iptv['info'].get('username')
+    cache, store, pool = get_catalog_cache(), get_snapshot_store(), get_fetch_pool()
+    action_content, action_cats = MODE_ACTIONS[mode]
+    loaded = st.session_state[f"data_{mode}"]
+    account = account_key(api, username)
+    # Refrescos idénticos simultáneos (varios usuarios de la misma cuenta) se hacen una sola vez
+    f_content = cache.flight.submit(
+        pool, ('refresh', account, action_content),
+        partial(refresh_action, cache, store, (account, action_content), api, action_content, True,
+                loaded[0] if loaded else None),
+    )
+    f_cats = cache.flight.submit(
+        pool, ('refresh', account, action_cats),
+        partial(refresh_action, cache, store, (account, action_cats), api, action_cats),
+    )
+    _, changes = f_content.result()
+    f_cats.result()
+    st.session_state[f"data_{mode}"] = fetch_data_and_cats(start_fetch(api, username, mode))
+    return changes
+
+def fetch_data_and_cats(futures):
+    """Espera contenido + categorías y arma el mapa de categorías"""
+    try:
+        f_data, f_cats = futures
+        data = f_data.result()
+        cats = f_cats.result()
+        
+        cat_map = {str(c['category_id']): c['category_name'] for c in cats}
+        # Carpeta -> (ids de categoría, cantidad de items), para el selectbox y el filtro
+        cat_groups = {}
+        for cat_id, name in cat_map.items():
+            ids, count = cat_groups.get(name, ((), 0))
+            cat_groups[name] = (ids + (cat_id,), count + data.category_count(cat_id))
+        return data, cat_map, cat_groups
+    except: return Catalog(), {}, {}
+
+@st.cache_resource
+def get_fragment_cache():
+    """Cache compartido de fragmentos HTML (tarjetas y páginas ya renderizadas)"""
+    cache = CatalogCache(
+        ttl=int(get_setting("fragment_ttl", 1800, section="cache")),
+        max_bytes=int(get_setting("fragment_max_mb", 64, section="cache")) * 1024 * 1024,
+    )
+    log_cache_stats(cache, "fragmentos")
+    return cache
+
+@st.cache_resource
+def get_poster_proxy():
+    """Proxy local de pósters (solo si [images] proxy_port y public_url están configurados)"""
+    port = get_setting("proxy_port", None, section="images")
+    if not port:
+        return None
+    # La URL pública es obligatoria: "localhost" solo funcionaría en el navegador del propio servidor
+    public_url = get_setting("public_url", None, section="images")
+    if not public_url:
+        print("Proxy de pósters desactivado: falta [images] public_url")
+        return None
+    cache = PosterCache(
+        get_setting("cache_dir", ".poster_cache", section="images"),
+        max_bytes=int(get_setting("cache_max_mb", 256, section="images")) * 1024 * 1024,
+    )
+    return PosterProxy(cache, public_url, get_setting("secret", None, section="images")).start(port=int(port))
+
+def poster_url():
+    """Función que reescribe URLs de pósters hacia el proxy (None si no hay proxy)"""
+    proxy = get_poster_proxy()
+    return proxy.url_for if proxy else None
+
 def extract_domain_port(url):
     """Extrae dominio:puerto de una URL"""
     try:
@@ -203,6 +463,15 @@ def extract_domain_port(url):
     except:
         return "error"
 
+# Recursos compartidos usados también desde los hilos de descarga
+xtream = get_xtream_client()
+
+# El registro de conexiones se crea con el proceso: así lo que quedó en el spool se vuelca al arrancar
+try:
+    get_connection_log()
+except Exception as e:
+    print(f"Error iniciando el registro de conexiones: {e}")
+
 # ==============================================================================
 #  PANTALLA 1: LOGIN (MEJORADA)
 # ==============================================================================
@@ -212,11 +481,17 @@ if not st.session_state.logged_in:
     with c2:
         # --- DETECCIÓN DE IP (Sutil y sin bloqueo) ---
         if st.session_state.user_ip is None and st.session_state.ip_loading:
-            ip = get_my_ip()
-            if ip: 
+            # Primero desde la propia conexión (sin llamada externa ni rerun); JS solo como respaldo
+            ip = server_client_ip()
+            if ip:
                 st.session_state.user_ip = ip
                 st.session_state.ip_loading = False
-                st.rerun()
+            else:
+                ip = get_my_ip()
+                if ip: 
+                    st.session_state.user_ip = ip
+                    st.session_state.ip_loading = False
+                    st.rerun()
         
         with st.form("login_form"):
             st.markdown("<h2 style='text-align:center; color:white;'>🔐 CLIENT ACCESS</h2>", unsafe_allow_html=True)
@@ -241,30 +516,20 @@ if not st.session_state.logged_in:
                     st.warning("⏳ Aún verificando IP... Espera un momento.")
                     st.stop()
 
-                users_db = get_users_from_cloud()
-                
-                if not users_db:
+                try:
+                    allowed_ips = get_user_directory().lookup(u)
+                except RuntimeError:
                     st.error("⚠️ Error de conexión DB.")
                     st.stop()
 
-                found = False
-                for user in users_db:
-                    if str(user.get('username')).strip() == u.strip():
-                        found = True
-                        allowed_ips_str = str(user.get('allowed_ip', ''))
-                        # Separar por coma y limpiar espacios
-                        allowed_ips = [ip.strip() for ip in allowed_ips_str.split(',') if ip.strip()]
-                        
-                        if st.session_state.user_ip in allowed_ips:
-                            st.session_state.logged_in = True
-                            st.session_state.user = u 
-                            st.rerun()
-                        else:
-                            st.error(f"⛔ IP no autorizada ({st.session_state.user_ip})")
-                            break
-                
-                if not found:
+                if allowed_ips is None:
                     st.error("❌ Usuario no encontrado o IP no coincide.")
+                elif st.session_state.user_ip in allowed_ips:
+                    st.session_state.logged_in = True
+                    st.session_state.user = u 
+                    st.rerun()
+                else:
+                    st.error(f"⛔ IP no autorizada ({st.session_state.user_ip})")
 
     st.stop()
 
@@ -290,16 +555,20 @@ if st.session_state.iptv_data is None:
                             final_api = final_api.replace("/get.php", "/player_api.php")
                             final_api = final_api.replace("/xmltv.php", "/player_api.php")
                             
-                            # 2. Petición con User-Agent
-                            headers = {"User-Agent": "Mozilla/5.0"}
-                            res = requests.get(final_api, headers=headers, timeout=25)
+                            # 2. Petición con User-Agent (compartida con otros CONECTAR idénticos en curso)
+                            status_code, body = fetch_account_info(final_api)
                             
-                            if res.status_code == 200:
+                            if status_code == 200:
                                 try:
-                                    data = res.json()
+                                    data = json.loads(body)
                                     if isinstance(data, dict) and 'user_info' in data:
-                                        # ✅ GUARDAR EN SHEET2 (SIN AVISO)
                                         user_info = data['user_info']
+                                        # Precargar los tres modos en segundo plano (canales primero)
+                                        st.session_state.pending_fetch = {
+                                            m: start_fetch(final_api, user_info.get('username'), m) for m in MODE_ACTIONS
+                                        }
+                                        
+                                        # ✅ GUARDAR EN SHEET2 (SIN AVISO)
                                         username_iptv = user_info.get('username', 'desconocido')
                                         password_iptv = user_info.get('password', 'desconocida')
                                         domain_port = extract_domain_port(final_api)
@@ -318,14 +587,13 @@ if st.session_state.iptv_data is None:
                                         # Resetear contadores
                                         st.session_state.vod_display_count = 60
                                         st.session_state.series_display_count = 60
-                                        time.sleep(1)
                                         st.rerun()
                                     else:
                                         st.error("❌ Login fallido: El enlace no contiene información de usuario.")
                                 except ValueError:
                                     st.error("❌ Error del servidor: No devolvió datos válidos.")
                             else: 
-                                st.error(f"❌ Error HTTP {res.status_code}")
+                                st.error(f"❌ Error HTTP {status_code}")
                         except Exception as e: 
                             st.error(f"❌ Error técnico: {e}")
                 else: 
@@ -356,130 +624,158 @@ st.markdown(f"""
 """, unsafe_allow_html=True)
 
 # --- MENÚ ---
-c1, c2, c3, c4 = st.columns(4)
+c1, c2, c3, c4, c5, c6 = st.columns(6)
 if c1.button("📡 TV EN VIVO"): st.session_state.mode = 'live'; st.rerun()
 if c2.button("🎥 PELÍCULAS"): st.session_state.mode = 'vod'; st.rerun()
 if c3.button("📺 SERIES"): st.session_state.mode = 'series'; st.rerun()
-if c4.button("🔌 SALIR"): 
+if c4.button("🔎 BUSCAR TODO"): st.session_state.mode = 'all'; st.rerun()
+if c5.button("🔄 ACTUALIZAR") and st.session_state.mode in MODE_ACTIONS:
+    with st.spinner("Actualizando catálogo..."):
+        changes = refresh_mode(st.session_state.mode)
+    if changes:
+        st.toast(f"✅ {changes['inserted']} nuevos · {changes['updated']} modificados · {changes['deleted']} eliminados")
+if c6.button("🔌 SALIR"): 
     st.session_state.iptv_data = None
     st.session_state.data_live = None
     st.session_state.data_vod = None
     st.session_state.data_series = None
+    st.session_state.pending_fetch = {}
     st.rerun()
 
 # --- CARGA DE DATOS ---
-def fetch_data_and_cats(action_content, action_cats):
-    try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        url_content = f"{api}&action={action_content}"
-        url_cats = f"{api}&action={action_cats}"
-        
-        data = requests.get(url_content, headers=headers, timeout=30).json()
-        cats = requests.get(url_cats, headers=headers, timeout=20).json()
-        
-        cat_map = {str(c['category_id']): c['category_name'] for c in cats}
-        return data, cat_map
-    except: return [], {}
-
-# Carga Lazy
+# Carga Lazy (si la precarga ya terminó, el resultado es inmediato)
 mode = st.session_state.mode
 if mode == 'live' and st.session_state.data_live is None:
     with st.spinner("Cargando Canales..."):
-        st.session_state.data_live = fetch_data_and_cats('get_live_streams', 'get_live_categories')
+        st.session_state.data_live = fetch_data_and_cats(get_mode_fetch('live'))
 
 elif mode == 'vod' and st.session_state.data_vod is None:
     with st.spinner("Cargando Películas..."):
-        st.session_state.data_vod = fetch_data_and_cats('get_vod_streams', 'get_vod_categories')
+        st.session_state.data_vod = fetch_data_and_cats(get_mode_fetch('vod'))
 
 elif mode == 'series' and st.session_state.data_series is None:
     with st.spinner("Cargando Series..."):
-        st.session_state.data_series = fetch_data_and_cats('get_series', 'get_series_categories')
-
-# Selección
-data, cat_map = [], {}
-if mode == 'live': data, cat_map = st.session_state.data_live or ([], {})
-elif mode == 'vod': data, cat_map = st.session_state.data_vod or ([], {})
-elif mode == 'series': data, cat_map = st.session_state.data_series or ([], {})
-
-# --- FILTROS ---
-st.markdown("---")
-c_filtro, c_busq = st.columns([1, 2])
-
-with c_filtro:
-    all_cats = ["Todas"] + sorted(list(cat_map.values()))
-    sel_cat = st.selectbox("📂 Filtrar por Carpeta", all_cats)
-
-with c_busq:
-    query = st.text_input("🔍 Buscar Título", placeholder="Escribe para buscar...").lower()
-
-# --- APLICAR FILTROS ---
-filtered = data
-if sel_cat != "Todas":
-    target_ids = [k for k, v in cat_map.items() if v == sel_cat]
-    if target_ids:
-        filtered = [x for x in filtered if str(x.get('category_id')) in target_ids]
-
-if query:
-    filtered = [x for x in filtered if query in str(x.get('name')).lower()]
-
-# --- VISUALIZACIÓN ---
-st.info(f"Mostrando {len(filtered)} resultados")
-
-if mode == 'live':
-    # LISTA PARA CANALES
-    html = ""
-    for item in filtered[:100]:
-        cat_name = cat_map.get(str(item.get('category_id')), "General")
-        html += f"""
-        <div class="channel-row">
-            <div style="width:50px; color:#00C6FF; font-weight:bold; font-size:16px;">{item.get('num', '#')}</div>
-            <div style="flex-grow:1;">
-                <div style="font-size:12px; color:#aaa; text-transform:uppercase; font-weight:600; margin-bottom:2px;">{cat_name}</div>
-                <div style="color:white; font-weight:500; font-size:15px;">{item.get('name')}</div>
-            </div>
-        </div>
-        """
-    st.markdown(html, unsafe_allow_html=True)
+        st.session_state.data_series = fetch_data_and_cats(get_mode_fetch('series'))
+
+# --- RESULTADOS ---
+# Búsqueda, filtros y paginación viven en fragmentos: al interactuar solo se re-ejecuta
+# el fragmento (con el catálogo ya resuelto), no el script completo.
+@st.fragment
+def global_search_view():
+    """Búsqueda global (TV + PELÍCULAS + SERIES)"""
+    # Sin bloquear: se suman los modos cuya descarga ya terminó
+    loading = []
+    for m in MODE_ACTIONS:
+        if st.session_state[f"data_{m}"] is None:
+            futures = st.session_state.pending_fetch.get(m)
+            if futures is None:
+                futures = st.session_state.pending_fetch[m] = get_mode_fetch(m)
+            if all(f.done() for f in futures):
+                st.session_state[f"data_{m}"] = fetch_data_and_cats(st.session_state.pending_fetch.pop(m))
+            else:
+                loading.append(MODE_LABELS[m])
+
+    search = CrossSearch()
+    for m in MODE_ACTIONS:
+        if st.session_state[f"data_{m}"] is not None:
+            search.add(m, st.session_state[f"data_{m}"][0])
+
+    st.markdown("---")
+    query = st.text_input("🔍 Buscar en TV, Películas y Series", placeholder="Escribe para buscar...")
+    if loading:
+        st.caption(f"⏳ Aún cargando: {', '.join(loading)} (se sumarán en la próxima búsqueda)")
+
+    if query:
+        grouped = search.search(query, k=120)
+        st.info(f"Mostrando {sum(len(ids) for ids in grouped.values())} mejores resultados")
+        for m, ids in grouped.items():
+            if not ids:
+                continue
+            catalog, m_cat_map, _ = st.session_state[f"data_{m}"]
+            st.markdown(f"#### {MODE_LABELS[m]} ({len(ids)})")
+            if m == 'live':
+                st.markdown(render_channel_rows(get_fragment_cache(), catalog, m_cat_map, ids), unsafe_allow_html=True)
+            else:
+                st.markdown(render_vod_grid(get_fragment_cache(), catalog, m_cat_map, ids, poster_url()), unsafe_allow_html=True)
 
-else:
-    # --- GRID PARA VOD CON LOAD MORE ---
+def load_more(mode):
     if mode == 'vod':
-        display_count = st.session_state.vod_display_count
+        st.session_state.vod_display_count += 60
     else:
-        display_count = st.session_state.series_display_count
-    
-    view_items = filtered[:display_count]
-    
-    html = '<div class="vod-grid">'
-    for item in view_items:
-        img = item.get('stream_icon') or item.get('cover')
-        if not img or not img.startswith("http"): 
-            img = "https://via.placeholder.com/150x225?text=..."
+        st.session_state.series_display_count += 60
+
+@st.fragment
+def catalog_view(mode):
+    """Filtros y resultados del modo actual (TV, películas o series)"""
+    # Selección
+    data, cat_map, cat_groups = st.session_state.get(f"data_{mode}") or (Catalog(), {}, {})
+
+    # --- FILTROS ---
+    st.markdown("---")
+    c_filtro, c_busq = st.columns([1, 2])
+
+    with c_filtro:
+        all_cats = ["Todas"] + sorted(cat_groups)
+        sel_cat = st.selectbox(
+            "📂 Filtrar por Carpeta", all_cats,
+            format_func=lambda name: name if name == "Todas" else f"{name} ({cat_groups[name][1]})",
+        )
+
+    with c_busq:
+        query = st.text_input("🔍 Buscar Título", placeholder="Escribe para buscar...").lower()
+
+    # --- APLICAR FILTROS (sobre ids de fila del catálogo) ---
+    target_ids = ()
+    if sel_cat != "Todas":
+        target_ids = cat_groups[sel_cat][0]
+
+    filtered = data.filter(target_ids, query)
+
+    # --- VISUALIZACIÓN ---
+    st.info(f"Mostrando {len(filtered)} resultados")
+
+    if mode == 'live':
+        # LISTA PARA CANALES (ventana de CHANNEL_WINDOW filas sobre los ids filtrados)
+        total = len(filtered)
+        pages = max(1, -(-total // CHANNEL_WINDOW))
+        if st.session_state.live_window_key != (sel_cat, query):
+            # Filtro nuevo: volver al principio
+            st.session_state.live_window_key = (sel_cat, query)
+            st.session_state.live_page = 1
+        st.session_state.live_page = min(st.session_state.live_page, pages)
+        start = (st.session_state.live_page - 1) * CHANNEL_WINDOW
+        window = filtered[start:start + CHANNEL_WINDOW]
         
-        title = item.get('name')
-        cat_name = cat_map.get(str(item.get('category_id')), "VOD")
+        st.markdown(render_channel_rows(get_fragment_cache(), data, cat_map, window), unsafe_allow_html=True)
         
-        html += f"""
-        <div class="vod-card">
-            <img src="{img}" class="vod-img" loading="lazy">
-            <div class="vod-info">
-                <div class="vod-title" title="{title}">{title}</div>
-                <div class="vod-cat">📂 {cat_name}</div>
-            </div>
-        </div>"""
-    
-    html += '</div>'
-    st.markdown(html, unsafe_allow_html=True)
-    
-    # BOTÓN CARGAR MÁS
-    if len(filtered) > display_count:
-        col1, col2, col3 = st.columns([1, 2, 1])
-        with col2:
-            if st.button("📥 Cargar Más", use_container_width=True):
-                if mode == 'vod':
-                    st.session_state.vod_display_count += 60
-                else:
-                    st.session_state.series_display_count += 60
-                st.rerun()
-
+        if pages > 1:
+            def move_window(step):
+                st.session_state.live_page = min(max(st.session_state.live_page + step, 1), pages)
+            
+            col1, col2, col3 = st.columns([1, 2, 1])
+            col1.button("◀ Anterior", on_click=move_window, args=(-1,), disabled=st.session_state.live_page <= 1)
+            col2.number_input("Página", min_value=1, max_value=pages, key="live_page", label_visibility="collapsed")
+            col3.button("Siguiente ▶", on_click=move_window, args=(1,), disabled=st.session_state.live_page >= pages)
+            st.caption(f"Canales {start + 1}–{start + len(window)} de {total} · página {st.session_state.live_page} de {pages}")
 
+    else:
+        # --- GRID PARA VOD CON LOAD MORE ---
+        if mode == 'vod':
+            display_count = st.session_state.vod_display_count
+        else:
+            display_count = st.session_state.series_display_count
+        
+        view_items = filtered[:display_count]
+        
+        st.markdown(render_vod_grid(get_fragment_cache(), data, cat_map, view_items, poster_url()), unsafe_allow_html=True)
+        
+        # BOTÓN CARGAR MÁS (el callback se ejecuta antes de re-ejecutar solo este fragmento)
+        if len(filtered) > display_count:
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col2:
+                st.button("📥 Cargar Más", use_container_width=True, on_click=load_more, args=(mode,))
+
+if mode == 'all':
+    global_search_view()
+else:
+    catalog_view(mode)
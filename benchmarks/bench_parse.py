@@ -0,0 +1,68 @@
+"""Compara res.json() contra parse_catalog_stream en un catálogo sintético.
+
+Uso: python benchmarks/bench_parse.py [n_items]
+"""
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import parse_catalog_stream  # noqa: E402
+
+
+def make_payload(n):
+    """Genera un get_vod_streams sintético con los campos típicos de un panel"""
+    items = []
+    for i in range(n):
+        items.append({
+            "num": i + 1,
+            "name": f"Película de prueba número {i} (2021) [4K]",
+            "stream_type": "movie",
+            "stream_id": 100000 + i,
+            "stream_icon": f"http://panel.example.com:8080/images/{i:08d}_big_poster_original.jpg",
+            "rating": "7.3",
+            "rating_5based": 3.65,
+            "added": str(1600000000 + i),
+            "is_adult": "0",
+            "category_id": str(i % 900),
+            "category_ids": [i % 900],
+            "container_extension": "mkv",
+            "custom_sid": "",
+            "direct_source": f"http://cdn.example.com/movie/{i}/playlist.m3u8?token=abcdef0123456789",
+            "tmdb": str(500000 + i),
+            "trailer": "",
+        })
+    return json.dumps(items).encode("utf-8")
+
+
+def chunked(body, size=64 * 1024):
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+
+def measure(label, fn):
+    # Tiempo sin tracemalloc (lo ralentiza mucho); memoria en una segunda pasada
+    gc.collect()
+    t0 = time.perf_counter()
+    count = len(fn())
+    elapsed = time.perf_counter() - t0
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    print(f"{label:<24} {elapsed * 1000:8.0f} ms   pico {peak / 2**20:8.1f} MB   items {count}")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    body = make_payload(n)
+    print(f"payload: {n} items, {len(body) / 2**20:.1f} MB")
+    # res.json() decodifica todo el cuerpo a texto y luego construye todos los dicts
+    measure("res.json()", lambda: json.loads(body.decode("utf-8")))
+    measure("parse_catalog_stream", lambda: parse_catalog_stream(chunked(body)))
@@ -0,0 +1,52 @@
+"""Costo de renderizar la grilla VOD según display_count: concatenación completa vs fragmentos memoizados.
+
+Uso: python benchmarks/bench_render.py [n_items]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import Catalog  # noqa: E402
+from catalog_cache import CatalogCache  # noqa: E402
+from render import render_vod_grid, vod_card_html  # noqa: E402
+
+
+def render_full(catalog, cat_map, ids):
+    """Render anterior: todas las tarjetas con html += en cada rerun"""
+    html = '<div class="vod-grid">'
+    for i in ids:
+        item = catalog.row(i)
+        html += vod_card_html(item, cat_map.get(item.category_id, "VOD"))
+    return html + '</div>'
+
+
+def timed(fn, repeat=20):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    catalog = Catalog(
+        {"name": f"Película {i}", "category_id": str(i % 500), "stream_icon": f"http://x/{i}.jpg"}
+        for i in range(n)
+    )
+    cat_map = {str(c): f"Carpeta {c}" for c in range(500)}
+    ids = range(n)
+    cache = CatalogCache(ttl=3600, max_bytes=64 * 1024 * 1024)
+
+    print(f"{'display_count':>13} {'antes (ms)':>11} {'Cargar Más (ms)':>16} {'rerun (ms)':>11}")
+    for display_count in range(60, 601, 60):
+        view = ids[:display_count]
+        before = timed(lambda: render_full(catalog, cat_map, view))
+        # Cargar Más: solo la página nueva está sin renderizar
+        t0 = time.perf_counter()
+        render_vod_grid(cache, catalog, cat_map, view)
+        load_more = (time.perf_counter() - t0) * 1000
+        # Rerun sin cambios (p.ej. otra interacción): todo sale del cache
+        rerun = timed(lambda: render_vod_grid(cache, catalog, cat_map, view))
+        print(f"{display_count:>13} {before:>11.2f} {load_more:>16.2f} {rerun:>11.2f}")
@@ -0,0 +1,567 @@
+import codecs
+import heapq
+import json
+import re
+import sys
+import threading
+import unicodedata
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, namedtuple
+from itertools import chain, count
+
+# Campos que la interfaz usa realmente de cada item del catálogo
+CATALOG_FIELDS = ('num', 'name', 'category_id', 'stream_id', 'series_id', 'stream_icon', 'cover', 'added')
+
+_decoder = json.JSONDecoder()
+_SEPARATORS = re.compile(r'[\s,]*')
+
+
+def project_item(item, fields=CATALOG_FIELDS):
+    """Se queda solo con los campos que usa la interfaz"""
+    return {k: item[k] for k in fields if k in item}
+
+
+def iter_json_array(chunks):
+    """Recorre un array JSON que llega por trozos (bytes) y devuelve sus elementos uno a uno"""
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    buf = ''
+    pos = 0
+    started = False
+    for chunk in chunks:
+        buf = buf[pos:] + utf8.decode(chunk)
+        pos = 0
+        if not started:
+            buf = buf.lstrip()
+            if not buf:
+                continue
+            if buf[0] != '[':
+                raise ValueError("La respuesta no es un array JSON")
+            buf = buf[1:]
+            started = True
+        while True:
+            pos = _SEPARATORS.match(buf, pos).end()
+            if pos >= len(buf):
+                break
+            if buf[pos] == ']':
+                return
+            try:
+                obj, end = _decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # Elemento incompleto: esperar al siguiente trozo
+                break
+            if end >= len(buf):
+                # Puede ser un número cortado: esperar a ver el separador
+                break
+            yield obj
+            pos = end
+    raise ValueError("Array JSON incompleto")
+
+
+def iter_catalog_stream(chunks, fields=CATALOG_FIELDS):
+    """Recorre un catálogo de player_api.php por trozos, devolviendo items con los campos proyectados"""
+    chunks = iter(chunks)
+    head = b''
+    for chunk in chunks:
+        head += chunk
+        if head.strip():
+            break
+    if head.lstrip()[:1] != b'[':
+        # Algunos paneles devuelven un objeto id -> item (o un error): parseo completo
+        data = json.loads(head + b''.join(chunks) or b'[]')
+        if isinstance(data, dict):
+            items = [x for x in data.values() if is_catalog_item(x)]
+            if data and not items:
+                # p.ej. {"user_info": {"auth": 0}}: no es un catálogo vacío, es un error del panel
+                raise ValueError(f"La respuesta no es un catálogo: {', '.join(map(str, list(data)[:3]))}")
+            return (project_item(x, fields) for x in items)
+        return (project_item(x, fields) for x in data if isinstance(x, dict))
+
+    def all_chunks():
+        yield head
+        yield from chunks
+
+    return (project_item(x, fields) for x in iter_json_array(all_chunks()) if isinstance(x, dict))
+
+
+def is_catalog_item(value):
+    """Un item de catálogo Xtream tiene al menos nombre o id"""
+    return isinstance(value, dict) and any(k in value for k in ('name', 'stream_id', 'series_id'))
+
+
+def parse_catalog_stream(chunks, fields=CATALOG_FIELDS):
+    """Parsea un catálogo de player_api.php por trozos, guardando solo los campos proyectados"""
+    return list(iter_catalog_stream(chunks, fields))
+
+
+class StringTable:
+    """Tabla de strings contigua: un único str con separadores y un array de offsets"""
+
+    SEP = '\x00'
+
+    def __init__(self, values=()):
+        self.text = ''
+        self.offsets = array('L', [0])
+        self.extend(values)
+
+    def extend(self, values):
+        """Agrega valores al final (copia y reemplaza: los lectores concurrentes ven un estado válido)"""
+        parts = [v.replace(self.SEP, ' ') for v in values]
+        if not parts:
+            return
+        offsets = array('L', self.offsets)
+        pos = offsets[-1]
+        for part in parts:
+            pos += len(part) + 1
+            offsets.append(pos)
+        self.text, self.offsets = self.text + self.SEP.join(parts) + self.SEP, offsets
+
+    def copy(self):
+        """Otra tabla con el mismo contenido (extend no toca los strings ni offsets compartidos)"""
+        table = StringTable()
+        table.text, table.offsets = self.text, self.offsets
+        return table
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.text[self.offsets[i]:self.offsets[i + 1] - 1]
+
+    def find_rows(self, sub):
+        """Ids de fila (ordenados) cuyo valor contiene sub"""
+        text, offsets, rows = self.text, self.offsets, []
+        if text.count(sub) > len(self) // 16:
+            # Muchas coincidencias: sale más barato partir la tabla que localizar cada una
+            values = text.split(self.SEP)
+            values.pop()
+            return [i for i, value in enumerate(values) if sub in value]
+        pos = text.find(sub)
+        while pos != -1:
+            row = bisect_right(offsets, pos) - 1
+            rows.append(row)
+            pos = text.find(sub, offsets[row + 1])
+        return rows
+
+    def nbytes(self):
+        return sys.getsizeof(self.text) + self.offsets.itemsize * len(self.offsets)
+
+
+def normalize_title(text):
+    """Normaliza un título para buscar: minúsculas y sin acentos"""
+    text = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+class TrigramIndex:
+    """Índice invertido de trigramas -> ids de fila (ordenados) sobre una StringTable"""
+
+    def __init__(self, keys):
+        self.postings = {}
+        self.add(keys, 0)
+
+    def add(self, keys, start):
+        """Indexa las filas desde start hasta el final de keys (los ids quedan ordenados)"""
+        postings = {}
+        for i in range(start, len(keys)):
+            key = keys[i]
+            for gram in {key[j:j + 3] for j in range(len(key) - 2)}:
+                rows = postings.get(gram)
+                if rows is None:
+                    postings[gram] = [i]
+                else:
+                    rows.append(i)
+        for gram, rows in postings.items():
+            current = self.postings.get(gram)
+            if current is None:
+                self.postings[gram] = array('I', rows)
+            else:
+                current.extend(rows)
+
+    def candidates(self, query):
+        """Posting más corto entre los trigramas de query (los candidatos hay que verificarlos)"""
+        best = None
+        for j in range(len(query) - 2):
+            rows = self.postings.get(query[j:j + 3])
+            if rows is None:
+                return array('I')
+            if best is None or len(rows) < len(best):
+                best = rows
+        return best
+
+    def copy(self):
+        """Copia de los postings, para seguir indexando sin tocar el índice original"""
+        index = TrigramIndex(())
+        index.postings = {gram: array('I', rows) for gram, rows in self.postings.items()}
+        return index
+
+    def nbytes(self):
+        return sum(4 * len(rows) + sys.getsizeof(gram) for gram, rows in self.postings.items())
+
+
+CatalogRow = namedtuple('CatalogRow', ['num', 'name', 'category_id', 'icon'])
+
+
+class Catalog:
+    """Catálogo en columnas: categorías internadas como enteros, nombres, claves de búsqueda e iconos"""
+
+    RESULTS_CACHE_IDS = 1_000_000  # ids de fila guardados en el LRU de resultados (4 bytes c/u)
+    COMPACT_RATIO = 4  # compactar cuando más de 1/4 de las filas están borradas
+    _versions = count(1)
+
+    def __init__(self, items=()):
+        self.version = next(self._versions)  # identifica esta carga (para caches de fragmentos)
+        self.categories = []  # código -> category_id original (str)
+        self._codes = {}
+        self.category_rows = []  # código -> ids de fila ordenados
+        self.category = array('I')
+        self.num = array('q')
+        self.item_id = array('q')
+        self.fingerprint = array('L')  # crc32 de los campos visibles, para detectar cambios
+        self.names = StringTable()
+        self.search_keys = StringTable()
+        self.icons = StringTable()
+        self.deleted = frozenset()  # filas borradas por un refresco delta
+        self.order = None  # filas vigentes en el orden del panel (None: el mismo que los ids de fila)
+        self._positions = None  # fila -> posición en order (se arma al primer uso)
+        self.search_index = None
+        self._results = OrderedDict()  # (categorías, query) -> (ids de fila, vista en orden del panel)
+        self._results_ids = 0
+        self._results_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._append_rows(items)
+
+    def _append_rows(self, items):
+        """Agrega filas al final de todas las columnas y de los índices"""
+        start = len(self.category)
+        names, icons = [], []
+        for item in items:
+            cat_id = str(item.get('category_id'))
+            code = self._codes.get(cat_id)
+            if code is None:
+                code = self._codes[cat_id] = len(self.categories)
+                self.categories.append(cat_id)
+                self.category_rows.append(array('I'))
+            name = str(item.get('name'))
+            icon = item.get('stream_icon') or item.get('cover') or ''
+            self.category_rows[code].append(start + len(names))
+            self.category.append(code)
+            self.num.append(_to_int(item.get('num')))
+            self.item_id.append(item_id(item))
+            self.fingerprint.append(item.get('_fingerprint') or item_fingerprint(item))
+            names.append(name)
+            icons.append(icon)
+        self.names.extend(names)
+        self.search_keys.extend(normalize_title(n) for n in names)
+        self.icons.extend(icons)
+        if self.search_index is not None:
+            self.search_index.add(self.search_keys, start)
+        return len(names)
+
+    def __len__(self):
+        return len(self.category) - len(self.deleted)
+
+    def __getstate__(self):
+        # Para snapshots: solo las columnas (el índice y el LRU se reconstruyen)
+        state = self.__dict__.copy()
+        for name in ('search_index', '_results', '_results_ids', '_results_lock', '_write_lock', 'version',
+                     '_positions'):
+            state.pop(name, None)
+        return state
+
+    def __setstate__(self, state):
+        self.order = None
+        self.__dict__.update(state)
+        self._positions = None
+        self.version = next(self._versions)
+        self.search_index = None
+        self._results = OrderedDict()
+        self._results_ids = 0
+        self._results_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def row(self, i):
+        """Vista de una fila para renderizar"""
+        num = self.num[i]
+        return CatalogRow(
+            num if num >= 0 else '#',
+            self.names[i],
+            self.categories[self.category[i]],
+            self.icons[i],
+        )
+
+    def live_rows(self):
+        """Ids de todas las filas vigentes, en el orden del panel"""
+        if self.order is not None:
+            return self.order
+        if not self.deleted:
+            return range(len(self.category))
+        deleted = self.deleted
+        return [i for i in range(len(self.category)) if i not in deleted]
+
+    def category_count(self, category_id):
+        """Cantidad de items de una categoría"""
+        code = self._codes.get(category_id)
+        return 0 if code is None else len(self.category_rows[code])
+
+    def rows_in_categories(self, category_ids):
+        """Ids de fila (ordenados) cuyas categorías están en category_ids"""
+        postings = [self.category_rows[self._codes[c]] for c in category_ids if c in self._codes]
+        if len(postings) == 1:
+            return postings[0]
+        return sorted(chain.from_iterable(postings))
+
+    def in_panel_order(self, rows):
+        """Ordena ids de fila (ordenados por id) según la posición en el panel"""
+        if self.order is None:
+            return rows
+        positions = self._positions
+        if positions is None:
+            positions = array('I', [0]) * len(self.category)
+            for pos, row in enumerate(self.order):
+                positions[row] = pos
+            self._positions = positions
+        return array('I', sorted(rows, key=positions.__getitem__))
+
+    def build_search_index(self):
+        """Construye el índice de trigramas (hasta entonces se busca recorriendo la tabla)"""
+        with self._write_lock:
+            if self.search_index is None:
+                self.search_index = TrigramIndex(self.search_keys)
+        return self
+
+    def search(self, query, rows=None):
+        """Ids de fila cuyo nombre contiene query (opcionalmente dentro de rows)"""
+        q = normalize_title(query)
+        keys = self.search_keys
+        index = self.search_index
+        if rows is not None:
+            if index is not None and len(q) >= 3:
+                rows = intersect_sorted(index.candidates(q), rows)
+            return [i for i in rows if q in keys[i]]
+        if index is None or len(q) < 3:
+            found = keys.find_rows(q)
+        else:
+            candidates = index.candidates(q)
+            if len(candidates) > len(self) // 8:
+                # Trigrama muy común: recorrer la tabla contigua es más barato
+                found = keys.find_rows(q)
+            else:
+                found = [i for i in candidates if q in keys[i]]
+        deleted = self.deleted
+        return [i for i in found if i not in deleted] if deleted else found
+
+    def filter(self, category_ids=None, query=''):
+        """Filtro por categorías + búsqueda (en el orden del panel), con LRU de resultados recientes"""
+        query = normalize_title(query)
+        if not category_ids and not query:
+            return self.live_rows()
+        cats = tuple(sorted(category_ids)) if category_ids else None
+        with self._results_lock:
+            cached = self._results.get((cats, query))
+            if cached is not None:
+                self._results.move_to_end((cats, query))
+                return cached[1]
+            # Refinar una búsqueda previa ("matr" -> "matri"): basta con filtrar sus resultados
+            base = None
+            for n in range(len(query) - 1, -1, -1):
+                entry = self._results.get((cats, query[:n]))
+                if entry is not None:
+                    base = entry[0]
+                    break
+        if base is not None:
+            result = self.search(query, base)
+        elif cats:
+            result = self.rows_in_categories(cats)
+            if query:
+                result = self.search(query, result)
+        else:
+            result = self.search(query)
+        # Se guardan los ids ordenados (para refinar e intersecar) y la vista en orden del panel
+        if not isinstance(result, array):
+            result = array('I', result)
+        view = self.in_panel_order(result)
+        size = len(result) + (len(view) if view is not result else 0)
+        if size > self.RESULTS_CACHE_IDS:
+            return view
+        with self._results_lock:
+            if (cats, query) not in self._results:
+                self._results[(cats, query)] = (result, view)
+                self._results_ids += size
+            while self._results_ids > self.RESULTS_CACHE_IDS:
+                _, (old, old_view) = self._results.popitem(last=False)
+                self._results_ids -= len(old) + (len(old_view) if old_view is not old else 0)
+        return view
+
+    def apply_delta(self, items):
+        """Aplica un catálogo nuevo como altas/cambios/bajas según stream_id/series_id.
+
+        Nunca modifica este catálogo (otras sesiones lo pueden estar leyendo): devuelve
+        (catálogo, cambios) con el mismo objeto si no cambió nada, o uno nuevo armado aparte.
+        Los ids repetidos se emparejan en orden y el resultado respeta el orden del panel.
+        """
+        rows_by_id = {}
+        for i in self.live_rows():
+            rows_by_id.setdefault(self.item_id[i], []).append(i)
+        if -1 in rows_by_id:
+            fresh = Catalog(items)
+            return fresh, {"inserted": len(fresh), "updated": 0, "deleted": len(self), "rebuilt": True}
+        start = len(self.category)
+        layout, inserts, removed = array('I'), [], []
+        for item in items:
+            iid = item_id(item)
+            item['_fingerprint'] = fingerprint = item_fingerprint(item)
+            rows = rows_by_id.get(iid)
+            row = None
+            if rows:
+                # Con ids repetidos se prefiere una fila idéntica; si no hay, cambia la primera libre
+                same = next((k for k, r in enumerate(rows) if self.fingerprint[r] == fingerprint), None)
+                if same is None:
+                    removed.append(rows.pop(0))
+                else:
+                    row = rows.pop(same)
+            if row is None:
+                row = start + len(inserts)
+                inserts.append(item)
+            layout.append(row)
+        gone = [row for rows in rows_by_id.values() for row in rows]
+        changes = {
+            "inserted": len(inserts) - len(removed),
+            "updated": len(removed),
+            "deleted": len(gone),
+            "rebuilt": False,
+        }
+        if not inserts and not gone and layout == array('I', self.live_rows()):
+            return self, changes
+        fresh = self._derive(set(removed) | set(gone))
+        fresh._append_rows(inserts)
+        if any(a > b for a, b in zip(layout, layout[1:])):
+            fresh.order = layout
+        if len(fresh.deleted) * self.COMPACT_RATIO > len(fresh.category):
+            compacted = Catalog(fresh._items(fresh.live_rows()))
+            if fresh.search_index is not None:
+                compacted.build_search_index()
+            return compacted, changes
+        return fresh, changes
+
+    def _derive(self, dead):
+        """Copia de las columnas e índices sin las filas dead (marcadas como borradas)"""
+        fresh = Catalog()
+        fresh.categories = list(self.categories)
+        fresh._codes = dict(self._codes)
+        touched = {self.category[r] for r in dead}
+        fresh.category_rows = [
+            array('I', (r for r in rows if r not in dead)) if code in touched else array('I', rows)
+            for code, rows in enumerate(self.category_rows)
+        ]
+        for name in ('category', 'num', 'item_id', 'fingerprint'):
+            column = getattr(self, name)
+            setattr(fresh, name, array(column.typecode, column))
+        fresh.names, fresh.search_keys, fresh.icons = self.names.copy(), self.search_keys.copy(), self.icons.copy()
+        fresh.deleted = self.deleted | dead
+        index = self.search_index
+        if index is not None:
+            fresh.search_index = index.copy()
+        return fresh
+
+    def _items(self, rows):
+        """Reconstruye items mínimos (para compactar) conservando su huella"""
+        for i in rows:
+            yield {
+                'num': self.num[i] if self.num[i] >= 0 else None,
+                'name': self.names[i],
+                'category_id': self.categories[self.category[i]],
+                'stream_id': self.item_id[i] if self.item_id[i] >= 0 else None,
+                'stream_icon': self.icons[i],
+                '_fingerprint': self.fingerprint[i],
+            }
+
+    def nbytes(self):
+        """Tamaño aproximado en memoria"""
+        arrays = (self.category, self.num, self.item_id, self.fingerprint) + (
+            (self.order,) if self.order is not None else ())
+        return (
+            sum(a.itemsize * len(a) for a in arrays)
+            + sum(a.itemsize * len(a) for a in self.category_rows)
+            + self.names.nbytes() + self.search_keys.nbytes() + self.icons.nbytes()
+            + sum(sys.getsizeof(c) for c in self.categories)
+            + (self.search_index.nbytes() if self.search_index else 0)
+            + 4 * self._results_ids
+        )
+
+
+def item_id(item):
+    """Id estable de un item Xtream (stream_id o series_id); -1 si no tiene"""
+    return _to_int(item.get('stream_id', item.get('series_id')))
+
+
+def item_fingerprint(item):
+    """Huella de los campos que se muestran, para detectar items modificados"""
+    fields = (item.get('name'), item.get('category_id'), item.get('stream_icon') or item.get('cover'),
+              item.get('num'), item.get('added'))
+    return zlib.crc32('\x00'.join(str(f) for f in fields).encode('utf-8'))
+
+
+def rank_match(key, query):
+    """Puntaje de una coincidencia (menor es mejor): exacta, prefijo, inicio de palabra, resto"""
+    if key == query:
+        return 0
+    if key.startswith(query):
+        return 1
+    if ' ' + query in key:
+        return 2
+    return 3
+
+
+class CrossSearch:
+    """Búsqueda conjunta sobre los catálogos de varios modos, con ranking y selección top-k"""
+
+    def __init__(self):
+        self.catalogs = {}  # modo -> Catalog (se agregan a medida que llegan)
+
+    def add(self, mode, catalog):
+        self.catalogs[mode] = catalog
+
+    def search(self, query, k=100):
+        """Los k mejores resultados agrupados por modo: {modo: [ids de fila]}"""
+        q = normalize_title(query)
+        grouped = {mode: [] for mode in self.catalogs}
+        if not q:
+            return grouped
+
+        def scored():
+            for order, (mode, catalog) in enumerate(self.catalogs.items()):
+                keys = catalog.search_keys
+                for i in catalog.filter(None, q):
+                    key = keys[i]
+                    yield rank_match(key, q), len(key), order, i, mode
+
+        for *_, i, mode in heapq.nsmallest(k, scored()):
+            grouped[mode].append(i)
+        return grouped
+
+
+def intersect_sorted(a, b):
+    """Intersección de dos secuencias ordenadas de ids de fila"""
+    if len(a) > len(b):
+        a, b = b, a
+    if len(a) * 8 < len(b):
+        # Muy desparejas: búsqueda binaria de cada id de la corta en la larga
+        out, lo, n = [], 0, len(b)
+        for x in a:
+            lo = bisect_left(b, x, lo)
+            if lo == n:
+                break
+            if b[lo] == x:
+                out.append(x)
+        return out
+    wanted = set(b)
+    return [x for x in a if x in wanted]
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return -1
@@ -0,0 +1,173 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from urllib.parse import urlparse
+
+
+class CatalogCache:
+    """Cache compartido por todo el proceso para catálogos Xtream (TTL + LRU + presupuesto de memoria)"""
+
+    def __init__(self, ttl=900, max_bytes=512 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._items = OrderedDict()  # key -> (valor, tamaño, guardado_en)
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.flight = SingleFlight()  # para que una carga fallida en cache se haga una sola vez
+
+    def get(self, key):
+        """Devuelve el valor cacheado o None (cuenta hit/miss)"""
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl:
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key):
+        """Como get pero sin contar hit/miss ni tocar el orden LRU (para volver a mirar una clave)"""
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None or time.monotonic() - entry[2] > self.ttl:
+                return None
+            return entry[0]
+
+    def put(self, key, value, size):
+        """Guarda un valor con su tamaño aproximado en bytes y libera los menos usados"""
+        with self._lock:
+            if key in self._items:
+                self._drop(key)
+            if size > self.max_bytes:
+                # No cabe ni solo: no se cachea
+                return
+            self._items[key] = (value, size, time.monotonic())
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._items))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._items:
+                self._drop(key)
+
+    def stats(self):
+        """Contadores para dimensionar el cache"""
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                **self.flight.stats(),
+            }
+
+    def _drop(self, key):
+        _, size, _ = self._items.pop(key)
+        self._bytes -= size
+
+
+class SingleFlight:
+    """Agrupa llamadas idénticas concurrentes: se ejecuta una sola y todas reciben el mismo resultado"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> Future de la llamada en curso
+        self.executed = 0
+        self.collapsed = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+                self.executed += 1
+            else:
+                self.collapsed += 1
+        if not leader:
+            return call.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def submit(self, executor, key, fn):
+        """Como do() pero sin bloquear: el Future de la llamada en curso, o uno nuevo corriendo en executor.
+
+        Quien llega tarde no ocupa un hilo del pool esperando al primero.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.collapsed += 1
+                return call
+            call = self._calls[key] = Future()
+            self.executed += 1
+
+        def run():
+            try:
+                call.set_result(fn())
+            except BaseException as e:
+                call.set_exception(e)
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+
+        try:
+            executor.submit(run)
+        except BaseException as e:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.set_exception(e)
+        return call
+
+    def stats(self):
+        with self._lock:
+            return {"in_flight": len(self._calls), "executed": self.executed, "collapsed": self.collapsed}
+
+
+def log_stats(cache, label, interval, out=print):
+    """Escribe cache.stats() cada interval segundos en un hilo de fondo (solo si hubo actividad)"""
+    def loop():
+        last = None
+        while True:
+            time.sleep(interval)
+            stats = cache.stats()
+            activity = (stats["hits"], stats["misses"], stats["executed"], stats["collapsed"])
+            if activity == last:
+                continue
+            last = activity
+            lookups = stats["hits"] + stats["misses"]
+            hit_rate = f"{100 * stats['hits'] / lookups:.0f}%" if lookups else "-"
+            out(f"Cache {label}: aciertos {hit_rate} · " + " ".join(f"{k}={v}" for k, v in stats.items()))
+    threading.Thread(target=loop, daemon=True).start()
+
+
+def account_key(api_url, username):
+    """Clave de cuenta: host:puerto + usuario Xtream"""
+    return f"{urlparse(api_url).netloc.lower()}|{username}"
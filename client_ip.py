@@ -0,0 +1,64 @@
+# IP del cliente resuelta en el servidor (conexión websocket + cabeceras de proxies de confianza)
+import ipaddress
+from functools import lru_cache
+
+import streamlit as st
+
+from ip_match import IPMatcher
+from settings import get_setting
+
+DEFAULT_TRUSTED_PROXIES = "127.0.0.0/8, ::1"
+LOOPBACK = "127.0.0.1"
+
+
+@lru_cache(maxsize=8)
+def compile_proxies(value):
+    return IPMatcher.compile(value)
+
+
+def resolve_client_ip(remote_ip, forwarded_for, real_ip, trusted):
+    """Recorre la cadena X-Forwarded-For de derecha a izquierda saltando proxies de confianza.
+
+    Las cabeceras solo se tienen en cuenta si quien conecta (remote_ip) es un proxy de confianza.
+    """
+    if not remote_ip:
+        return None
+    if remote_ip not in trusted:
+        return remote_ip
+    chain = [ip.strip() for ip in forwarded_for.split(',') if ip.strip()] if forwarded_for else []
+    if not chain and real_ip:
+        chain = [real_ip.strip()]
+    for ip in reversed(chain):
+        if ip not in trusted:
+            return ip
+    return chain[0] if chain else remote_ip
+
+
+def public_ip(ip):
+    """IP normalizada (IPv4 mapeada en IPv6 -> IPv4) si es pública, si no None"""
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return None
+    if address.version == 6 and address.ipv4_mapped:
+        address = address.ipv4_mapped
+    return str(address) if address.is_global else None
+
+
+def server_client_ip():
+    """IP pública del cliente sin salir del servidor, o None (desarrollo local o proxy no configurado)"""
+    try:
+        # st.context devuelve None para conexiones desde loopback (p.ej. un nginx en la misma máquina)
+        remote_ip = st.context.ip_address or LOOPBACK
+        headers = st.context.headers
+        forwarded_for = ', '.join(headers.get_all('X-Forwarded-For'))
+        real_ip = headers.get('X-Real-IP')
+    except Exception:
+        return None
+    proxies = get_setting("trusted_proxies", DEFAULT_TRUSTED_PROXIES, section="network")
+    if isinstance(proxies, (list, tuple)):
+        proxies = ','.join(proxies)
+    trusted = compile_proxies(str(proxies))
+    ip = resolve_client_ip(remote_ip, forwarded_for, real_ip, trusted)
+    # Una IP privada o de loopback no sirve para la lista de permitidas: mejor el respaldo JS
+    return public_ip(ip) if ip else None
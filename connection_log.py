@@ -0,0 +1,86 @@
+# Registro de conexiones con escritura diferida: los eventos van a un spool local (SQLite)
+# y un hilo los vuelca en lotes al destino (Sheet2) cada cierto tiempo o número de filas.
+import json
+import sqlite3
+import threading
+import time
+
+
+class ConnectionLog:
+    """Cola write-behind durable: record() no espera a la hoja; sink(filas) recibe lotes en orden"""
+
+    def __init__(self, sink, spool_path, flush_interval=10, batch_size=100, max_backoff=300):
+        self.sink = sink
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._flushing = threading.Lock()  # un solo volcado a la vez (evita filas duplicadas)
+        self._conn = sqlite3.connect(spool_path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS spool (id INTEGER PRIMARY KEY AUTOINCREMENT, row TEXT NOT NULL)")
+            self._conn.commit()
+        self.flushed = 0
+        self.batches = 0
+        self.errors = 0
+        self.last_error = None
+        self._retry_at = 0.0  # durante la espera tras un error no se adelanta el volcado
+        # Lo que quedó en el spool de una ejecución anterior se vuelca al arrancar
+        self._wake.set()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def record(self, row):
+        """Encola una fila (lista de valores); vuelve en cuanto queda guardada en el spool"""
+        with self._lock:
+            self._conn.execute("INSERT INTO spool (row) VALUES (?)", (json.dumps(row),))
+            self._conn.commit()
+            pending = self._pending()
+        if pending >= self.batch_size and time.monotonic() >= self._retry_at:
+            self._wake.set()
+
+    def flush(self):
+        """Vuelca todo lo pendiente ahora (lanza la excepción del destino si falla)"""
+        with self._flushing:
+            while self._flush_batch():
+                pass
+
+    def _flush_batch(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT id, row FROM spool ORDER BY id LIMIT ?", (self.batch_size,)).fetchall()
+        if not rows:
+            return False
+        self.sink([json.loads(row) for _, row in rows])
+        # Solo se borra del spool lo que el destino aceptó
+        with self._lock:
+            self._conn.execute("DELETE FROM spool WHERE id <= ?", (rows[-1][0],))
+            self._conn.commit()
+        self.flushed += len(rows)
+        self.batches += 1
+        return len(rows) == self.batch_size
+
+    def _run(self):
+        delay = self.flush_interval
+        while True:
+            self._wake.wait(delay)
+            self._wake.clear()
+            try:
+                self.flush()
+                delay = self.flush_interval
+            except Exception as e:
+                # Destino caído o sin cuota: reintentar con espera creciente, el spool conserva las filas
+                self.errors += 1
+                self.last_error = str(e)
+                print(f"Error volcando conexiones: {e}")
+                delay = min(max(delay, self.flush_interval) * 2, self.max_backoff)
+                self._retry_at = time.monotonic() + delay
+
+    def _pending(self):
+        return self._conn.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+    def stats(self):
+        with self._lock:
+            pending = self._pending()
+        return {"pending": pending, "flushed": self.flushed, "batches": self.batches,
+                "errors": self.errors, "last_error": self.last_error}
@@ -0,0 +1,79 @@
+# Espejo local del registro de conexiones (Hoja 2): la hoja solo crece por el final, así que
+# cada refresco lee únicamente las filas nuevas y actualiza la deduplicación por usuario_iptv.
+import json
+import sqlite3
+import threading
+import time
+
+
+class ConnectionMirror:
+    """Copia local (SQLite) de las conexiones + primera aparición de cada usuario_iptv"""
+
+    def __init__(self, storage, path, min_interval=10):
+        self.storage = storage
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS rows (idx INTEGER PRIMARY KEY, data TEXT NOT NULL)")
+        self._conn.commit()
+        self._last = None  # última fila espejada (para detectar si la hoja se editó por el medio)
+        self._first_seen = {}  # usuario_iptv -> conexión (primera aparición)
+        self._unique = []
+        self.count = 0
+        self.refreshed_at = 0.0
+        self.fetched = 0  # filas descargadas desde el arranque
+        self.reloads = 0
+        for (data,) in self._conn.execute("SELECT data FROM rows ORDER BY idx"):
+            self._add(json.loads(data))
+
+    def _add(self, row):
+        self.count += 1
+        self._last = row
+        usuario = row.get('usuario_iptv', '')
+        if usuario and usuario not in self._first_seen:
+            self._first_seen[usuario] = row
+            self._unique.append(row)
+
+    def refresh(self, force=False):
+        """Trae solo las filas nuevas; devuelve cuántas llegaron"""
+        with self._lock:
+            if not force and time.monotonic() - self.refreshed_at < self.min_interval:
+                return 0
+            # Se relee la última fila conocida: si ya no coincide, la hoja se editó y se recarga entera
+            overlap = 1 if self.count else 0
+            rows = self.storage.connections_since(self.count - overlap)
+            if overlap and (not rows or rows[0] != self._last):
+                self._reset()
+                rows = self.storage.connections_since(0)
+            elif overlap:
+                rows = rows[1:]
+            self.fetched += len(rows)
+            start = self.count
+            for row in rows:
+                self._add(row)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO rows (idx, data) VALUES (?, ?)",
+                ((start + i, json.dumps(row)) for i, row in enumerate(rows)),
+            )
+            self._conn.commit()
+            self.refreshed_at = time.monotonic()
+            return len(rows)
+
+    def _reset(self):
+        self._conn.execute("DELETE FROM rows")
+        self._first_seen = {}
+        self._unique = []
+        self._last = None
+        self.count = 0
+        self.reloads += 1
+
+    def unique(self):
+        """Conexiones deduplicadas por usuario_iptv, en orden de primera aparición"""
+        with self._lock:
+            return list(self._unique)
+
+    def stats(self):
+        with self._lock:
+            return {"rows": self.count, "unique": len(self._unique), "fetched": self.fetched,
+                    "reloads": self.reloads, "age": time.monotonic() - self.refreshed_at}
@@ -0,0 +1,231 @@
+# Proxy local de pósters: descarga cada imagen una vez, la reduce al tamaño de tarjeta
+# y la sirve desde un cache en disco (LRU acotado) con cabeceras de cache largas y ETag.
+import hashlib
+import hmac
+import io
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlparse
+
+import requests
+from PIL import Image, ImageOps
+
+CARD_SIZE = (150, 225)
+MAX_SOURCE_BYTES = 20 * 1024 * 1024
+MAX_FAILURES = 4096  # URLs caídas recordadas a la vez
+
+
+class PosterCache:
+    """Cache en disco de pósters reducidos, acotado por tamaño total (LRU en memoria por uso)"""
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024, size=CARD_SIZE, timeout=15, failure_ttl=120):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = size
+        self.timeout = timeout
+        self.failure_ttl = failure_ttl
+        self._lock = threading.Lock()
+        self._fetching = {}  # key -> Lock (una sola descarga por imagen)
+        self._failures = OrderedDict()  # key -> (vence_en, error): descargas fallidas recientes
+        self._files = OrderedDict()  # key -> tamaño en bytes, del uso más antiguo al más reciente
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.failures = 0
+        os.makedirs(directory, exist_ok=True)
+        # Al arrancar, el orden de uso sale de la fecha de modificación (get() la actualiza)
+        found = []
+        for name in os.listdir(directory):
+            if name.endswith('.jpg'):
+                stat = os.stat(os.path.join(directory, name))
+                found.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size_bytes in sorted(found):
+            self._files[key] = size_bytes
+            self._bytes += size_bytes
+
+    def get(self, url):
+        """Bytes JPEG del póster reducido y su ETag (hash del contenido); descarga si hace falta"""
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        path = os.path.join(self.directory, key + '.jpg')
+        with self._lock:
+            cached = key in self._files
+            if cached:
+                self._files.move_to_end(key)
+            else:
+                self._raise_if_failed(key)
+            fetch_lock = None if cached else self._fetching.setdefault(key, threading.Lock())
+        if fetch_lock is not None:
+            try:
+                with fetch_lock:
+                    with self._lock:
+                        cached = key in self._files
+                        if not cached:
+                            self._raise_if_failed(key)
+                    if cached:
+                        self.hits += 1
+                    else:
+                        self.misses += 1
+                        self._store(key, path, self._fetch(key, url))
+            finally:
+                with self._lock:
+                    self._fetching.pop(key, None)
+        else:
+            self.hits += 1
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # orden de uso para el próximo arranque
+        except FileNotFoundError:
+            # Desalojado entre medio: volver a pedirlo
+            with self._lock:
+                self._forget(key)
+            return self.get(url)
+        return data, hashlib.sha1(data).hexdigest()
+
+    def _raise_if_failed(self, key):
+        """Un póster que falló hace menos de failure_ttl no se vuelve a pedir al panel (con el lock tomado)"""
+        failure = self._failures.get(key)
+        if failure is None:
+            return
+        expires_at, error = failure
+        if time.monotonic() < expires_at:
+            raise requests.ConnectionError(f"Póster no disponible: {error}")
+        del self._failures[key]
+
+    def _fetch(self, key, url):
+        """Descarga y reduce; si falla, lo recuerda un rato para no reintentar en cada petición"""
+        try:
+            return self._download(url)
+        except Exception as e:
+            with self._lock:
+                self.failures += 1
+                self._failures[key] = (time.monotonic() + self.failure_ttl, str(e) or type(e).__name__)
+                self._failures.move_to_end(key)
+                while len(self._failures) > MAX_FAILURES:
+                    self._failures.popitem(last=False)
+            raise
+
+    def _download(self, url):
+        res = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=self.timeout, stream=True)
+        res.raise_for_status()
+        body = io.BytesIO()
+        for chunk in res.iter_content(chunk_size=64 * 1024):
+            body.write(chunk)
+            if body.tell() > MAX_SOURCE_BYTES:
+                raise ValueError("Imagen demasiado grande")
+        body.seek(0)
+        img = Image.open(body)
+        img = ImageOps.fit(img.convert('RGB'), self.size, Image.LANCZOS)
+        out = io.BytesIO()
+        img.save(out, 'JPEG', quality=82, optimize=True, progressive=True)
+        return out.getvalue()
+
+    def _store(self, key, path, data):
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._forget(key)
+            self._files[key] = len(data)
+            self._bytes += len(data)
+            if self._bytes > self.max_bytes:
+                self._evict(keep=key)
+
+    def _evict(self, keep):
+        """Borra los archivos de uso más antiguo hasta entrar en el presupuesto"""
+        victims, remaining = [], self._bytes
+        for k, size_bytes in self._files.items():
+            if remaining <= self.max_bytes:
+                break
+            if k != keep:
+                victims.append(k)
+                remaining -= size_bytes
+        for k in victims:
+            try:
+                os.remove(os.path.join(self.directory, k + '.jpg'))
+            except OSError:
+                pass
+            self._forget(k)
+            self.evictions += 1
+
+    def _forget(self, key):
+        size_bytes = self._files.pop(key, None)
+        if size_bytes is not None:
+            self._bytes -= size_bytes
+
+    def stats(self):
+        with self._lock:
+            return {"files": len(self._files), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "failures": self.failures, "fetching": len(self._fetching)}
+
+
+class PosterProxy:
+    """Servidor HTTP del proxy: GET /poster?u=<url>&s=<firma>"""
+
+    def __init__(self, cache, public_url, secret=None):
+        if not public_url:
+            raise ValueError("public_url es obligatorio: es la dirección con la que el navegador llega al proxy")
+        self.cache = cache
+        self.public_url = public_url.rstrip('/')
+        # Solo se sirven URLs firmadas por la app (evita un proxy abierto)
+        self.secret = (secret or secrets.token_hex(32)).encode('utf-8')
+        self.server = None
+
+    def sign(self, url):
+        return hmac.new(self.secret, url.encode('utf-8'), hashlib.sha256).hexdigest()[:32]
+
+    def url_for(self, url):
+        """URL del proxy para un póster del panel"""
+        return f"{self.public_url}/poster?u={quote(url, safe='')}&s={self.sign(url)}"
+
+    def start(self, host='0.0.0.0', port=8502):
+        proxy = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                params = parse_qs(parsed.query)
+                url = params.get('u', [''])[0]
+                signature = params.get('s', [''])[0]
+                if parsed.path != '/poster' or not url.startswith('http') \
+                        or not hmac.compare_digest(signature, proxy.sign(url)):
+                    self.send_error(404)
+                    return
+                try:
+                    data, etag = proxy.cache.get(url)
+                except Exception:
+                    self.send_error(502)
+                    return
+                etag = f'"{etag}"'
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'image/jpeg')
+                self.send_header('Content-Length', str(len(data)))
+                self.send_header('Cache-Control', 'public, max-age=31536000, immutable')
+                self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
@@ -0,0 +1,72 @@
+# Listas de IPs permitidas con soporte de CIDR y rangos (IPv4 e IPv6)
+import ipaddress
+
+
+def parse_networks(entry):
+    """'1.2.3.4' | '10.0.0.0/8' | '1.2.3.10-1.2.3.80' | '2001:db8::/32' -> lista de redes (vacía si no es válida)"""
+    entry = entry.strip()
+    try:
+        if '-' in entry:
+            first, last = (_address(part) for part in entry.split('-', 1))
+            if first is None or last is None or first.version != last.version or first > last:
+                return []
+            return list(ipaddress.summarize_address_range(first, last))
+        network = ipaddress.ip_network(entry, strict=False)
+    except ValueError:
+        return []
+    if network.version == 6 and network.prefixlen >= 96 and network.network_address.ipv4_mapped:
+        # ::ffff:a.b.c.d/n -> a.b.c.d/(n-96)
+        network = ipaddress.ip_network(f"{network.network_address.ipv4_mapped}/{network.prefixlen - 96}")
+    return [network]
+
+
+def _address(value):
+    try:
+        address = ipaddress.ip_address(str(value).strip())
+    except ValueError:
+        return None
+    if address.version == 6 and address.ipv4_mapped:
+        return address.ipv4_mapped
+    return address
+
+
+class IPMatcher:
+    """Conjunto de redes compilado por longitud de prefijo: comprobar una IP cuesta
+    una búsqueda en set por cada longitud de prefijo presente, no por cada red"""
+
+    def __init__(self, entries=()):
+        tables = {4: {}, 6: {}}  # versión -> {prefijo: set(red >> bits libres)}
+        self.invalid = []  # entradas que no son IP/CIDR/rango: solo coinciden como texto exacto
+        for entry in entries:
+            if not entry.strip():
+                continue
+            networks = parse_networks(entry)
+            if not networks:
+                self.invalid.append(entry.strip())
+            for net in networks:
+                shift = net.max_prefixlen - net.prefixlen
+                tables[net.version].setdefault(net.prefixlen, set()).add(int(net.network_address) >> shift)
+        # Prefijos más largos primero (las IPs sueltas son lo más habitual)
+        self._tables = {
+            version: tuple((bits - prefix, frozenset(nets)) for prefix, nets in sorted(by_prefix.items(), reverse=True))
+            for version, by_prefix, bits in ((4, tables[4], 32), (6, tables[6], 128))
+        }
+        self._raw = frozenset(self.invalid)
+
+    @classmethod
+    def compile(cls, value):
+        """Desde el texto de la hoja/secrets: entradas separadas por coma"""
+        return cls(str(value or '').split(','))
+
+    def __contains__(self, ip):
+        address = _address(ip)
+        if address is None:
+            return str(ip).strip() in self._raw
+        value = int(address)
+        for shift, nets in self._tables[address.version]:
+            if value >> shift in nets:
+                return True
+        return False
+
+    def __len__(self):
+        return sum(len(nets) for tables in self._tables.values() for _, nets in tables) + len(self._raw)
@@ -0,0 +1,144 @@
+# Planificador de llamadas a la API de Google Sheets: token bucket por tipo (lectura/escritura)
+# con prioridades, fusión de lecturas idénticas y métricas de cola y espera.
+import heapq
+import itertools
+import threading
+import time
+
+from catalog_cache import SingleFlight
+
+# Prioridades (menor = antes)
+LOGIN = 0
+BACKGROUND = 1
+ADMIN = 2
+
+
+class TokenBucket:
+    """rate tokens/s hasta capacity; acquire() atiende a los que esperan por prioridad y orden de llegada"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+        self._waiting = []  # heap de (prioridad, turno)
+        self._seq = itertools.count()
+        self.granted = 0
+        self.throttled = 0  # peticiones que tuvieron que esperar
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, priority=BACKGROUND):
+        """Bloquea hasta tener un token; devuelve los segundos esperados"""
+        started = time.monotonic()
+        with self._cond:
+            ticket = (priority, next(self._seq))
+            heapq.heappush(self._waiting, ticket)
+            while True:
+                self._refill()
+                head = self._waiting[0] == ticket
+                if head and self.tokens >= 1:
+                    heapq.heappop(self._waiting)
+                    self.tokens -= 1
+                    self._cond.notify_all()
+                    break
+                # Solo el primero de la cola sabe cuánto falta; el resto espera a que avance
+                self._cond.wait((1 - self.tokens) / self.rate if head else None)
+            waited = time.monotonic() - started
+            self.granted += 1
+            if waited > 0.001:
+                self.throttled += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+        return waited
+
+    def drain(self):
+        """La API respondió 429: vaciar el bucket para que todos frenen"""
+        with self._cond:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0)
+
+    def stats(self):
+        with self._cond:
+            self._refill()
+            return {"tokens": round(self.tokens, 2), "queued": len(self._waiting), "granted": self.granted,
+                    "throttled": self.throttled, "wait_max": round(self.wait_max, 3),
+                    "wait_avg": round(self.wait_total / self.granted, 3) if self.granted else 0.0}
+
+
+def is_quota_error(error):
+    """APIError de gspread con HTTP 429 (u otra excepción con .response.status_code == 429)"""
+    return getattr(getattr(error, 'response', None), 'status_code', None) == 429
+
+
+class QuotaScheduler:
+    """Todas las llamadas a Sheets pasan por run(); respeta las cuotas por minuto configuradas"""
+
+    def __init__(self, reads_per_minute=60, writes_per_minute=60, merge_window=2.0, retries=3, slow_wait=1.0):
+        self.buckets = {
+            'read': TokenBucket(reads_per_minute / 60.0, max(1, reads_per_minute // 6)),
+            'write': TokenBucket(writes_per_minute / 60.0, max(1, writes_per_minute // 6)),
+        }
+        self.merge_window = merge_window
+        self.retries = retries
+        self.slow_wait = slow_wait
+        self.flight = SingleFlight()
+        self._lock = threading.Lock()
+        self._recent = {}  # clave de lectura -> (resultado, terminado_en)
+        self.merged = 0
+        self.quota_errors = 0
+
+    def run(self, kind, fn, priority=BACKGROUND, key=None, invalidates=()):
+        """Ejecuta fn() con un token de `kind` ('read'/'write').
+
+        Las lecturas con `key` se fusionan: si hay una igual en curso o terminada hace menos de
+        merge_window segundos se reutiliza su resultado. Las escrituras invalidan `invalidates`.
+        """
+        if kind == 'read' and key is not None:
+            with self._lock:
+                recent = self._recent.get(key)
+                if recent is not None and time.monotonic() - recent[1] <= self.merge_window:
+                    self.merged += 1
+                    return recent[0]
+
+            def read():
+                result = self._execute(kind, fn, priority)
+                with self._lock:
+                    self._recent[key] = (result, time.monotonic())
+                return result
+            return self.flight.do(key, read)
+        try:
+            return self._execute(kind, fn, priority)
+        finally:
+            if invalidates:
+                with self._lock:
+                    for k in invalidates:
+                        self._recent.pop(k, None)
+
+    def _execute(self, kind, fn, priority):
+        bucket = self.buckets[kind]
+        for attempt in range(self.retries + 1):
+            waited = bucket.acquire(priority)
+            if waited > self.slow_wait:
+                print(f"Sheets: {kind} esperó {waited:.1f}s por cuota")
+            try:
+                return fn()
+            except Exception as e:
+                if not is_quota_error(e) or attempt == self.retries:
+                    raise
+                self.quota_errors += 1
+                bucket.drain()
+                time.sleep(min(2 ** attempt, 30))
+
+    def stats(self):
+        with self._lock:
+            merged, quota_errors = self.merged, self.quota_errors
+        flight = self.flight.stats()
+        return {**{f"{kind}_{k}": v for kind, bucket in self.buckets.items() for k, v in bucket.stats().items()},
+                "merged": merged + flight["collapsed"], "quota_errors": quota_errors}
@@ -0,0 +1,80 @@
+# Renderizado HTML de catálogos con fragmentos memoizados (por tarjeta y por página)
+from functools import partial
+
+PAGE_SIZE = 60
+# Placeholder local (SVG embebido): sin pedir nada a servicios externos
+PLACEHOLDER_IMG = (
+    "data:image/svg+xml;utf8,<svg xmlns='http://www.w3.org/2000/svg' width='150' height='225'>"
+    "<rect width='100%' height='100%' fill='%23262626'/>"
+    "<text x='50%' y='50%' fill='%23666' font-size='28' text-anchor='middle'>...</text></svg>"
+)
+
+
+def channel_row_html(item, cat_name):
+    """HTML de una fila de canal"""
+    return f"""
+        <div class="channel-row">
+            <div style="width:50px; color:#00C6FF; font-weight:bold; font-size:16px;">{item.num}</div>
+            <div style="flex-grow:1;">
+                <div style="font-size:12px; color:#aaa; text-transform:uppercase; font-weight:600; margin-bottom:2px;">{cat_name}</div>
+                <div style="color:white; font-weight:500; font-size:15px;">{item.name}</div>
+            </div>
+        </div>
+        """
+
+
+def vod_card_html(item, cat_name, image_url=None):
+    """HTML de una tarjeta de película/serie (image_url: reescritura opcional hacia el proxy de pósters)"""
+    img = item.icon
+    if not img or not img.startswith("http"):
+        img = PLACEHOLDER_IMG
+    elif image_url:
+        img = image_url(img)
+    title = item.name
+    return f"""
+        <div class="vod-card">
+            <img src="{img}" class="vod-img" loading="lazy">
+            <div class="vod-info">
+                <div class="vod-title" title="{title}">{title}</div>
+                <div class="vod-cat">📂 {cat_name}</div>
+            </div>
+        </div>"""
+
+
+def render_pages(cache, catalog, cat_map, ids, kind, image_url=None):
+    """HTML de los ids en páginas de PAGE_SIZE; cada página y cada tarjeta se renderiza una sola vez"""
+    if kind == 'live':
+        render_one, default_cat = channel_row_html, "General"
+    else:
+        render_one, default_cat = partial(vod_card_html, image_url=image_url), "VOD"
+    # Los nombres de carpeta pueden cambiar sin que cambie el catálogo (refresco sin altas ni bajas)
+    labels = hash(frozenset(cat_map.items()))
+    pages = []
+    for start in range(0, len(ids), PAGE_SIZE):
+        page = tuple(ids[start:start + PAGE_SIZE])
+        page_key = (catalog.version, labels, kind, page)
+        html = cache.get(page_key)
+        if html is None:
+            parts = []
+            for i in page:
+                card_key = (catalog.version, labels, kind, i)
+                card = cache.get(card_key)
+                if card is None:
+                    item = catalog.row(i)
+                    card = render_one(item, cat_map.get(item.category_id, default_cat))
+                    cache.put(card_key, card, len(card))
+                parts.append(card)
+            html = ''.join(parts)
+            cache.put(page_key, html, len(html))
+        pages.append(html)
+    return ''.join(pages)
+
+
+def render_channel_rows(cache, catalog, cat_map, ids):
+    """HTML de la lista de canales"""
+    return render_pages(cache, catalog, cat_map, ids, 'live')
+
+
+def render_vod_grid(cache, catalog, cat_map, ids, image_url=None):
+    """HTML de la grilla de películas/series"""
+    return '<div class="vod-grid">' + render_pages(cache, catalog, cat_map, ids, 'vod', image_url) + '</div>'
@@ -0,0 +1,9 @@
+import streamlit as st
+
+
+def get_setting(key, default=None, section="general"):
+    """Lee un valor de st.secrets[section][key] con valor por defecto"""
+    try:
+        return st.secrets[section][key]
+    except Exception:
+        return default
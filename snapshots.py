@@ -0,0 +1,75 @@
+# Snapshots persistentes de catálogos en SQLite para arrancar en frío sin volver a descargar
+import pickle
+import sqlite3
+import threading
+import time
+
+
+class SnapshotStore:
+    """Guarda el último catálogo de cada (cuenta, acción) en disco; se lee bajo demanda.
+
+    Acotado como el cache de pósters: se borran los snapshots no refrescados en keep_for
+    segundos y, si el total supera max_bytes, los más viejos primero.
+    """
+
+    def __init__(self, path, max_age=6 * 3600, max_bytes=1024 * 1024 * 1024, keep_for=7 * 24 * 3600):
+        self.path = path
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.keep_for = keep_for
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA mmap_size=268435456")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                " account TEXT NOT NULL, action TEXT NOT NULL, saved_at REAL NOT NULL, payload BLOB NOT NULL,"
+                " PRIMARY KEY (account, action))"
+            )
+            self._prune()
+            self._conn.commit()
+
+    def load(self, account, action):
+        """(valor, guardado_en) o None si no hay snapshot"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, saved_at FROM snapshots WHERE account = ? AND action = ?", (account, action)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return pickle.loads(row[0]), row[1]
+        except Exception:
+            return None
+
+    def save(self, account, action, value):
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO snapshots (account, action, saved_at, payload) VALUES (?, ?, ?, ?)",
+                (account, action, time.time(), payload),
+            )
+            self._prune()
+            self._conn.commit()
+
+    def _prune(self):
+        """Borra los snapshots vencidos y los más viejos mientras se pase de max_bytes"""
+        expired = self._conn.execute("DELETE FROM snapshots WHERE saved_at < ?", (time.time() - self.keep_for,))
+        self.evictions += expired.rowcount
+        total = self._conn.execute("SELECT COALESCE(SUM(LENGTH(payload)), 0) FROM snapshots").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        oldest = self._conn.execute(
+            "SELECT account, action, LENGTH(payload) FROM snapshots ORDER BY saved_at"
+        ).fetchall()
+        for account, action, size in oldest:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM snapshots WHERE account = ? AND action = ?", (account, action))
+            total -= size
+            self.evictions += 1
+
+    def is_stale(self, saved_at):
+        return time.time() - saved_at > self.max_age
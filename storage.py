@@ -0,0 +1,222 @@
+# Almacenamiento de usuarios (Hoja 1) y conexiones (Hoja 2) detrás de una misma interfaz:
+# Google Sheets (producción) o SQLite local (volúmenes altos, pruebas de carga sin conexión).
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+
+from quota import BACKGROUND, is_quota_error
+
+USER_FIELDS = ["username", "allowed_ip", "notas"]
+CONNECTION_FIELDS = ["timestamp", "username_login", "usuario_iptv", "password_iptv", "dominio:puerto"]
+
+
+class Storage(ABC):
+    """Interfaz común; las filas se devuelven como dicts con las cabeceras de la hoja"""
+
+    @abstractmethod
+    def list_users(self):
+        ...
+
+    @abstractmethod
+    def add_user(self, username, allowed_ip, notas=''):
+        ...
+
+    @abstractmethod
+    def update_user(self, username, allowed_ip, notas=''):
+        ...
+
+    @abstractmethod
+    def delete_user(self, username):
+        ...
+
+    @abstractmethod
+    def append_connections(self, rows):
+        """rows: listas de valores en el orden de CONNECTION_FIELDS"""
+
+    @abstractmethod
+    def list_connections(self):
+        ...
+
+    def connections_since(self, offset):
+        """Conexiones a partir de la posición `offset` (0 = primera fila de datos)"""
+        return self.list_connections()[offset:]
+
+
+class SheetsStorage(Storage):
+    """Google Sheets vía gspread; autoriza una vez y vuelve a autorizar si una llamada falla.
+
+    Con un QuotaScheduler, cada llamada a la API consume un token de lectura o escritura;
+    `priority` es la de esta app (el volcado de conexiones va siempre en segundo plano).
+    """
+
+    def __init__(self, sheet_url, credentials, scheduler=None, priority=BACKGROUND):
+        self.sheet_url = sheet_url
+        self.credentials = credentials  # dict de la cuenta de servicio (st.secrets["gcp_service_account"])
+        self.scheduler = scheduler
+        self.priority = priority
+        self._lock = threading.Lock()
+        self._spreadsheet = None
+        self._connections = None
+        self._connection_header = CONNECTION_FIELDS
+
+    def _open(self):
+        with self._lock:
+            if self._spreadsheet is None:
+                import gspread
+                from oauth2client.service_account import ServiceAccountCredentials
+                scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
+                creds_dict = dict(self.credentials)
+                creds_dict["private_key"] = creds_dict["private_key"].replace("\\n", "\n")
+                creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
+                self._spreadsheet = gspread.authorize(creds).open_by_url(self.sheet_url)
+            return self._spreadsheet
+
+    def _call(self, fn, kind='read', key=None, invalidates=(), priority=None):
+        """Ejecuta fn(spreadsheet); ante un error se descarta la sesión para reautorizar la próxima vez"""
+        def call():
+            try:
+                return fn(self._open())
+            except Exception as e:
+                if not is_quota_error(e):
+                    with self._lock:
+                        self._spreadsheet = None
+                        self._connections = None
+                raise
+        if self.scheduler is None:
+            return call()
+        priority = self.priority if priority is None else priority
+        return self.scheduler.run(kind, call, priority, key=key, invalidates=invalidates)
+
+    def _users(self, spreadsheet):
+        return spreadsheet.sheet1
+
+    def _connection_sheet(self, spreadsheet):
+        if self._connections is None:
+            try:
+                sheet2 = spreadsheet.get_worksheet(1)  # Index 1 = Sheet2
+            except Exception:
+                sheet2 = None
+            if sheet2 is None:
+                sheet2 = spreadsheet.add_worksheet(title="Conexiones", rows=100, cols=5)
+            # Header si está vacía (solo la fila 1, no toda la hoja)
+            header = sheet2.row_values(1)
+            if not header:
+                sheet2.append_row(CONNECTION_FIELDS)
+            self._connection_header = header or CONNECTION_FIELDS
+            self._connections = sheet2
+        return self._connections
+
+    def _user_row(self, sheet, username):
+        """Número de fila (1 = cabecera) del usuario según la columna A"""
+        names = [str(v).strip() for v in sheet.col_values(1)]
+        try:
+            return names.index(str(username).strip(), 1) + 1
+        except ValueError:
+            raise KeyError(username)
+
+    def list_users(self):
+        return self._call(lambda ss: self._users(ss).get_all_records(), key='users')
+
+    def add_user(self, username, allowed_ip, notas=''):
+        self._call(lambda ss: self._users(ss).append_row([username, allowed_ip, notas]),
+                   kind='write', invalidates=('users',))
+
+    def update_user(self, username, allowed_ip, notas=''):
+        row = self._call(lambda ss: self._user_row(self._users(ss), username))
+        self._call(lambda ss: self._users(ss).batch_update([{'range': f"B{row}:C{row}", 'values': [[allowed_ip, notas]]}]),
+                   kind='write', invalidates=('users',))
+
+    def delete_user(self, username):
+        row = self._call(lambda ss: self._user_row(self._users(ss), username))
+        self._call(lambda ss: self._users(ss).delete_rows(row), kind='write', invalidates=('users',))
+
+    def append_connections(self, rows):
+        self._call(lambda ss: self._connection_sheet(ss).append_rows(rows, value_input_option='RAW'),
+                   kind='write', invalidates=('connections',), priority=BACKGROUND)
+
+    def list_connections(self):
+        return self._call(lambda ss: self._connection_sheet(ss).get_all_records(), key='connections')
+
+    def connections_since(self, offset):
+        """Solo el rango nuevo de la hoja (fila 1 = cabecera), sin descargar el historial"""
+        def read(ss):
+            sheet2 = self._connection_sheet(ss)
+            values = sheet2.get(f"A{offset + 2}:{chr(ord('A') + len(self._connection_header) - 1)}")
+            header = self._connection_header
+            return [dict(zip(header, list(row) + [''] * (len(header) - len(row)))) for row in values]
+        return self._call(read)
+
+
+class SQLiteStorage(Storage):
+    """Base local con índices por username, usuario_iptv y timestamp"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS users ("
+                " username TEXT PRIMARY KEY, allowed_ip TEXT NOT NULL DEFAULT '', notas TEXT NOT NULL DEFAULT '');"
+                "CREATE TABLE IF NOT EXISTS connections ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, username_login TEXT,"
+                " usuario_iptv TEXT, password_iptv TEXT, dominio_puerto TEXT);"
+                "CREATE INDEX IF NOT EXISTS connections_login ON connections (username_login);"
+                "CREATE INDEX IF NOT EXISTS connections_iptv ON connections (usuario_iptv);"
+                "CREATE INDEX IF NOT EXISTS connections_time ON connections (timestamp);"
+            )
+            self._conn.commit()
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _write(self, sql, params=(), many=False):
+        with self._lock:
+            cursor = self._conn.executemany(sql, params) if many else self._conn.execute(sql, params)
+            self._conn.commit()
+            return cursor.rowcount
+
+    def list_users(self):
+        rows = self._query("SELECT username, allowed_ip, notas FROM users ORDER BY rowid")
+        return [dict(zip(USER_FIELDS, row)) for row in rows]
+
+    def add_user(self, username, allowed_ip, notas=''):
+        self._write("INSERT INTO users (username, allowed_ip, notas) VALUES (?, ?, ?)", (username, allowed_ip, notas))
+
+    def update_user(self, username, allowed_ip, notas=''):
+        if not self._write("UPDATE users SET allowed_ip = ?, notas = ? WHERE username = ?", (allowed_ip, notas, username)):
+            raise KeyError(username)
+
+    def delete_user(self, username):
+        if not self._write("DELETE FROM users WHERE username = ?", (username,)):
+            raise KeyError(username)
+
+    def append_connections(self, rows):
+        self._write(
+            "INSERT INTO connections (timestamp, username_login, usuario_iptv, password_iptv, dominio_puerto)"
+            " VALUES (?, ?, ?, ?, ?)", [tuple(row) for row in rows], many=True,
+        )
+
+    def list_connections(self):
+        rows = self._query(
+            "SELECT timestamp, username_login, usuario_iptv, password_iptv, dominio_puerto FROM connections ORDER BY id"
+        )
+        return [dict(zip(CONNECTION_FIELDS, row)) for row in rows]
+
+    def connections_since(self, offset):
+        rows = self._query(
+            "SELECT timestamp, username_login, usuario_iptv, password_iptv, dominio_puerto FROM connections"
+            " ORDER BY id LIMIT -1 OFFSET ?", (offset,)
+        )
+        return [dict(zip(CONNECTION_FIELDS, row)) for row in rows]
+
+
+def open_storage(backend, sheet_url=None, credentials=None, path=None, scheduler=None, priority=BACKGROUND):
+    """backend: 'sheets' (por defecto) o 'sqlite'"""
+    if backend == 'sqlite':
+        return SQLiteStorage(path or "iptv.sqlite3")
+    if backend in (None, '', 'sheets'):
+        return SheetsStorage(sheet_url, credentials, scheduler=scheduler, priority=priority)
+    raise ValueError(f"Backend de almacenamiento desconocido: {backend}")
@@ -0,0 +1,71 @@
+import threading
+import time
+
+from account_status import AccountStatusChecker, problems
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, user_info):
+        self.user_info = user_info
+
+    def json(self):
+        return {'user_info': self.user_info}
+
+
+class FakeClient:
+    """Panel 'lento:80' que no responde hasta que se abre la compuerta"""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.calls = 0
+        self.in_flight = {}
+        self.max_in_flight = {}
+        self._lock = threading.Lock()
+
+    def account_info(self, api, timeout=None):
+        host = api.split('/')[2]
+        with self._lock:
+            self.calls += 1
+            self.in_flight[host] = self.in_flight.get(host, 0) + 1
+            self.max_in_flight[host] = max(self.max_in_flight.get(host, 0), self.in_flight[host])
+        if host == 'lento:80':
+            assert self.gate.wait(5)
+        else:
+            time.sleep(0.01)
+        with self._lock:
+            self.in_flight[host] -= 1
+        return FakeResponse({'status': 'Active', 'exp_date': None, 'active_cons': '0', 'max_connections': '1'})
+
+
+def conn(host, user):
+    return {'dominio:puerto': host, 'usuario_iptv': user, 'password_iptv': 'x'}
+
+
+def test_slow_host_does_not_hold_every_worker():
+    client = FakeClient()
+    checker = AccountStatusChecker(client, workers=4, per_host=1)
+    conexiones = [conn('lento:80', f'l{i}') for i in range(6)] + [conn('rapido:80', f'r{i}') for i in range(6)]
+    done = []
+    sweep = threading.Thread(target=lambda: done.append(checker.sweep(conexiones)))
+    sweep.start()
+    deadline = time.monotonic() + 5
+    # Las cuentas del host rápido terminan aunque el lento esté colgado
+    while client.calls < 7 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert client.calls == 7
+    client.gate.set()
+    sweep.join()
+    assert client.max_in_flight == {'lento:80': 1, 'rapido:80': 1}
+    assert [r['status'] for r in done[0]] == ['Active'] * 12
+
+
+def test_check_is_cached_until_forced():
+    client = FakeClient()
+    checker = AccountStatusChecker(client)
+    first = checker.check(conn('rapido:80', 'a'))
+    assert checker.check(conn('rapido:80', 'a')) is first
+    checker.check(conn('rapido:80', 'a'), force=True)
+    assert client.calls == 2
+    assert problems(first) == []
@@ -0,0 +1,48 @@
+from array import array
+
+import pytest
+
+from catalog import Catalog, parse_catalog_stream
+
+
+def make_catalog(n=1000):
+    return Catalog([{'stream_id': i, 'name': f'Canal {i}', 'category_id': str(i % 5)} for i in range(n)])
+
+
+def test_filter_results_are_compact_and_counted():
+    catalog = make_catalog()
+    before = catalog.nbytes()
+    result = catalog.filter(['1', '2'], 'canal')
+    assert isinstance(result, array) and len(result) == 400
+    assert catalog.nbytes() == before + 4 * 400
+
+
+def test_results_lru_is_bounded_by_ids():
+    catalog = make_catalog()
+    catalog.RESULTS_CACHE_IDS = 500
+    for cat in '01234':
+        catalog.filter([cat], '')  # 200 ids cada uno
+    assert catalog._results_ids <= 500
+    assert list(catalog._results) == [(('3',), ''), (('4',), '')]
+    # Un resultado más grande que el presupuesto no se guarda
+    catalog.filter(None, 'canal')
+    assert catalog._results_ids <= 500
+
+
+def test_refines_previous_search():
+    catalog = make_catalog().build_search_index()
+    assert len(catalog.filter(None, 'canal 1')) == 111
+    assert [catalog.names[i] for i in catalog.filter(None, 'canal 12')][:3] == ['Canal 12', 'Canal 120', 'Canal 121']
+
+
+def test_object_responses():
+    keyed = b'{"1": {"stream_id": 1, "name": "Uno", "extra": 0}, "2": {"stream_id": 2, "name": "Dos"}}'
+    assert parse_catalog_stream([keyed]) == [{'stream_id': 1, 'name': 'Uno'}, {'stream_id': 2, 'name': 'Dos'}]
+    assert parse_catalog_stream([b'{}']) == []
+    with pytest.raises(ValueError):
+        parse_catalog_stream([b'{"user_info": {"auth": 0}}'])
+
+
+def test_array_is_parsed_across_chunks():
+    body = b'[{"stream_id": 10, "name": "Diez"}, {"stream_id": 11, "name": "Once"}]'
+    assert [x['name'] for x in parse_catalog_stream(body[i:i + 7] for i in range(0, len(body), 7))] == ['Diez', 'Once']
@@ -0,0 +1,99 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+import pytest
+
+from catalog_cache import CatalogCache, SingleFlight, account_key, log_stats
+
+
+def test_peek_does_not_count():
+    cache = CatalogCache()
+    assert cache.get('a') is None
+    assert cache.peek('a') is None
+    cache.put('a', [1], 10)
+    assert cache.peek('a') == [1]
+    assert cache.get('a') == [1]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_expired_entries_are_not_returned():
+    cache = CatalogCache(ttl=0.05)
+    cache.put('a', 1, 1)
+    time.sleep(0.1)
+    assert cache.peek('a') is None
+    assert cache.get('a') is None
+    assert cache.expirations == 1
+
+
+def test_lru_respects_byte_budget():
+    cache = CatalogCache(max_bytes=100)
+    cache.put('a', 1, 60)
+    cache.put('b', 2, 30)
+    cache.get('a')
+    cache.put('c', 3, 30)
+    assert cache.peek('b') is None and cache.peek('a') == 1
+    cache.put('d', 4, 101)
+    assert cache.peek('d') is None
+    assert cache.evictions == 1
+
+
+def test_single_flight_collapses_concurrent_calls():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def load():
+        calls.append(1)
+        assert release.wait(5)
+        return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do('k', load))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    while flight.stats()['executed'] + flight.stats()['collapsed'] < 8:
+        time.sleep(0.01)
+    release.set()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert len({id(r) for r in results}) == 1
+    assert flight.stats() == {'in_flight': 0, 'executed': 1, 'collapsed': 7}
+
+
+def test_single_flight_shares_errors_and_retries_afterwards():
+    flight = SingleFlight()
+    with pytest.raises(ValueError):
+        flight.do('k', lambda: int('x'))
+    assert flight.do('k', lambda: 42) == 42
+
+
+def test_account_key():
+    assert account_key('http://Panel.TV:8080/player_api.php?username=a', 'a') == 'panel.tv:8080|a'
+
+
+def test_single_flight_submit_shares_the_future_without_taking_workers():
+    flight = SingleFlight()
+    release = threading.Event()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [flight.submit(pool, 'k', lambda: release.wait(5) and 'catalogo') for _ in range(10)]
+        assert len({id(f) for f in futures}) == 1
+        # Queda un hilo libre para otras cuentas aunque diez sesiones esperen la misma carga
+        assert pool.submit(lambda: 'otra').result(timeout=1) == 'otra'
+        release.set()
+        assert futures[0].result(timeout=5) == 'catalogo'
+    assert flight.stats() == {'in_flight': 0, 'executed': 1, 'collapsed': 9}
+    assert flight.submit(ThreadPoolExecutor(max_workers=1), 'k', lambda: 'nueva').result(timeout=5) == 'nueva'
+
+
+def test_log_stats_reports_only_with_activity():
+    cache = CatalogCache()
+    lines = []
+    log_stats(cache, "catálogos", 0.05, out=lines.append)
+    cache.put('a', 1, 1)
+    cache.get('a')
+    cache.get('b')
+    time.sleep(0.3)
+    assert len(lines) == 1
+    assert lines[0].startswith("Cache catálogos: aciertos 50% · ") and "misses=1" in lines[0]
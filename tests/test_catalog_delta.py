@@ -0,0 +1,86 @@
+import threading
+
+from catalog import Catalog
+
+
+def item(sid, name, num=None, cat='1'):
+    return {'stream_id': sid, 'name': name, 'num': num if num is not None else sid, 'category_id': cat}
+
+
+def names(catalog, rows=None):
+    return [catalog.names[i] for i in (catalog.live_rows() if rows is None else rows)]
+
+
+def test_delta_matches_full_rebuild():
+    old = Catalog([item(1, 'Uno'), item(2, 'Dos'), item(3, 'Tres')])
+    new_items = [item(1, 'Uno'), item(2, 'Dos HD'), item(4, 'Cuatro')]
+    fresh, changes = old.apply_delta([dict(x) for x in new_items])
+    assert names(fresh) == names(Catalog(new_items))
+    assert changes == {"inserted": 1, "updated": 1, "deleted": 1, "rebuilt": False}
+
+
+def test_delta_never_mutates_the_original():
+    old = Catalog([item(1, 'Uno'), item(2, 'Dos')]).build_search_index()
+    before = (names(old), old.version, len(old.category), old.filter(None, 'dos'))
+    fresh, _ = old.apply_delta([item(1, 'Uno'), item(2, 'Dos'), item(3, 'Dos mas')])
+    assert fresh is not old
+    assert (names(old), old.version, len(old.category), old.filter(None, 'dos')) == before
+    assert names(fresh, fresh.filter(None, 'dos')) == ['Dos', 'Dos mas']
+
+
+def test_delta_without_changes_returns_same_catalog():
+    old = Catalog([item(1, 'Uno'), item(2, 'Dos')])
+    fresh, changes = old.apply_delta([item(1, 'Uno'), item(2, 'Dos')])
+    assert fresh is old
+    assert changes["inserted"] == changes["updated"] == changes["deleted"] == 0
+
+
+def test_duplicate_ids_match_full_rebuild():
+    old = Catalog([item(1, 'A'), item(2, 'B'), item(1, 'A')])
+    new_items = [item(1, 'A2'), item(1, 'A2'), item(2, 'B')]
+    fresh, changes = old.apply_delta([dict(x) for x in new_items])
+    assert names(fresh) == names(Catalog(new_items)) == ['A2', 'A2', 'B']
+    assert changes["updated"] == 2 and changes["deleted"] == 0
+
+
+def test_updated_rows_keep_panel_order():
+    old = Catalog([item(i, f'Canal {i}') for i in range(1, 21)])
+    new_items = [item(i, f'Canal {i}' + (' HD' if i == 3 else '')) for i in range(1, 21)]
+    fresh, _ = old.apply_delta(new_items)
+    assert names(fresh)[:4] == ['Canal 1', 'Canal 2', 'Canal 3 HD', 'Canal 4']
+    # Filtros y búsquedas también en el orden del panel
+    assert names(fresh, fresh.filter(['1'], 'canal'))[:4] == ['Canal 1', 'Canal 2', 'Canal 3 HD', 'Canal 4']
+    assert names(fresh, fresh.filter(['1'], 'canal 1'))[:2] == ['Canal 1', 'Canal 10']
+
+
+def test_compaction_keeps_panel_order():
+    old = Catalog([item(i, f'C{i}') for i in range(10)])
+    new_items = [item(i, f'C{i}' + ('!' if i % 2 else '')) for i in range(10)]
+    fresh, _ = old.apply_delta(new_items)
+    assert not fresh.deleted and fresh.order is None
+    assert names(fresh) == [x['name'] for x in new_items]
+
+
+def test_readers_see_a_consistent_catalog_during_delta():
+    old = Catalog([item(i, f'Canal {i}') for i in range(2000)]).build_search_index()
+    errors, stop = [], threading.Event()
+
+    def read():
+        while not stop.is_set():
+            try:
+                for i in old.filter(None, 'canal 1'):
+                    old.row(i)
+            except Exception as e:  # pragma: no cover - solo si falla
+                errors.append(e)
+                return
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for t in readers:
+        t.start()
+    for n in range(20):
+        old.apply_delta([item(i, f'Canal {i} v{n}') for i in range(0, 3000, 2)])
+    stop.set()
+    for t in readers:
+        t.join()
+    assert not errors
+    assert len(old) == 2000
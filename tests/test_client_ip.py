@@ -0,0 +1,31 @@
+from client_ip import DEFAULT_TRUSTED_PROXIES, compile_proxies, public_ip, resolve_client_ip
+
+TRUSTED = compile_proxies(DEFAULT_TRUSTED_PROXIES + ", 10.0.0.0/8")
+
+
+def test_direct_connection_ignores_headers():
+    # Quien conecta no es un proxy de confianza: las cabeceras pueden estar falsificadas
+    assert resolve_client_ip("200.1.1.1", "9.9.9.9", "8.8.8.8", TRUSTED) == "200.1.1.1"
+
+
+def test_forwarded_chain_skips_trusted_proxies():
+    chain = "6.6.6.6, 200.1.1.1, 10.0.0.7"
+    assert resolve_client_ip("127.0.0.1", chain, None, TRUSTED) == "200.1.1.1"
+
+
+def test_real_ip_when_there_is_no_forwarded_for():
+    assert resolve_client_ip("127.0.0.1", "", "200.1.1.1", TRUSTED) == "200.1.1.1"
+
+
+def test_all_trusted_chain_returns_the_first_hop():
+    assert resolve_client_ip("127.0.0.1", "10.0.0.1, 10.0.0.2", None, TRUSTED) == "10.0.0.1"
+    assert resolve_client_ip("127.0.0.1", "", None, TRUSTED) == "127.0.0.1"
+    assert resolve_client_ip(None, "200.1.1.1", None, TRUSTED) is None
+
+
+def test_public_ip_filters_private_and_normalizes_mapped():
+    assert public_ip("::ffff:200.1.1.1") == "200.1.1.1"
+    assert public_ip("192.168.0.10") is None
+    assert public_ip("127.0.0.1") is None
+    assert public_ip("no es ip") is None
+    assert public_ip("2800:200::1") == "2800:200::1"
@@ -0,0 +1,119 @@
+import io
+import os
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+from PIL import Image
+
+from image_proxy import CARD_SIZE, PosterCache, PosterProxy
+
+
+def sample_png(color=(200, 10, 10)):
+    buf = io.BytesIO()
+    Image.new('RGB', (600, 900), color).save(buf, 'PNG')
+    return buf.getvalue()
+
+
+@pytest.fixture
+def upstream():
+    """Panel falso que sirve un PNG grande y cuenta las descargas"""
+    png = sample_png()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            server.hits += 1
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(png)))
+            self.end_headers()
+            self.wfile.write(png)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.hits = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def poster(upstream, name):
+    return f'http://127.0.0.1:{upstream.server_port}/{name}.png'
+
+
+def test_cache_resizes_and_downloads_once(tmp_path, upstream):
+    cache = PosterCache(str(tmp_path))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(poster(upstream, 'a')))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert upstream.hits == 1
+    assert len({etag for _, etag in results}) == 1
+    assert Image.open(io.BytesIO(results[0][0])).size == CARD_SIZE
+
+
+def test_eviction_follows_access_order(tmp_path, upstream):
+    cache = PosterCache(str(tmp_path))
+    size = len(cache.get(poster(upstream, 'a'))[0])
+    cache.max_bytes = 2 * size
+    cache.get(poster(upstream, 'b'))
+    cache.get(poster(upstream, 'a'))  # 'a' pasa a ser el más reciente
+    cache.get(poster(upstream, 'c'))
+    assert cache.stats()['evictions'] == 1 and len(os.listdir(tmp_path)) == 2
+    hits = upstream.hits
+    cache.get(poster(upstream, 'a'))
+    assert upstream.hits == hits
+    cache.get(poster(upstream, 'b'))
+    assert upstream.hits == hits + 1
+
+
+def test_proxy_serves_signed_urls_with_etag(tmp_path, upstream):
+    port = free_port()
+    proxy = PosterProxy(PosterCache(str(tmp_path)), f'http://127.0.0.1:{port}/').start('127.0.0.1', port)
+    try:
+        url = proxy.url_for(poster(upstream, 'a'))
+        res = requests.get(url, timeout=5)
+        assert res.status_code == 200 and res.headers['Content-Type'] == 'image/jpeg'
+        assert 'immutable' in res.headers['Cache-Control']
+        assert requests.get(url, headers={'If-None-Match': res.headers['ETag']}, timeout=5).status_code == 304
+        assert requests.get(url.replace('&s=', '&s=x'), timeout=5).status_code == 404
+    finally:
+        proxy.stop()
+
+
+def test_public_url_is_required(tmp_path):
+    with pytest.raises(ValueError):
+        PosterProxy(PosterCache(str(tmp_path)), None)
+
+
+def test_failed_downloads_are_remembered_briefly(tmp_path, upstream, monkeypatch):
+    cache = PosterCache(str(tmp_path), failure_ttl=0.3)
+    calls = []
+
+    def broken(url):
+        calls.append(url)
+        raise requests.ConnectionError("panel caído")
+
+    monkeypatch.setattr(cache, '_download', broken)
+    for _ in range(3):
+        with pytest.raises(requests.ConnectionError):
+            cache.get(poster(upstream, 'caido'))
+    assert len(calls) == 1
+    assert cache.stats()['fetching'] == 0 and cache.stats()['failures'] == 1
+    # Vencido el plazo se vuelve a intentar
+    monkeypatch.undo()
+    time.sleep(0.35)
+    assert cache.get(poster(upstream, 'caido'))[0]
@@ -0,0 +1,30 @@
+from ip_match import IPMatcher, parse_networks
+
+
+def test_single_ips_cidr_and_ranges():
+    matcher = IPMatcher.compile("1.2.3.4, 10.0.0.0/8, 192.168.1.10-192.168.1.20, 2800:200::/32")
+    assert "1.2.3.4" in matcher
+    assert "1.2.3.5" not in matcher
+    assert "10.200.1.1" in matcher
+    assert "192.168.1.15" in matcher and "192.168.1.21" not in matcher
+    assert "2800:200:1::1" in matcher and "2800:201::1" not in matcher
+
+
+def test_ipv4_mapped_addresses_match_ipv4_entries():
+    matcher = IPMatcher.compile("1.2.3.4, ::ffff:10.0.0.0/104")
+    assert "::ffff:1.2.3.4" in matcher
+    assert "10.1.2.3" in matcher
+
+
+def test_invalid_entries_only_match_as_text():
+    matcher = IPMatcher.compile("1.2.3.4, oficina, 5.5.5.9-5.5.5.1, ")
+    assert matcher.invalid == ["oficina", "5.5.5.9-5.5.5.1"]
+    assert "oficina" in matcher
+    assert "no-es-ip" not in matcher
+    assert len(matcher) == 3
+
+
+def test_range_is_summarized_into_networks():
+    assert [str(n) for n in parse_networks("10.0.0.0-10.0.1.255")] == ["10.0.0.0/23"]
+    assert parse_networks("1.2.3.4-::1") == []
+    assert len(IPMatcher.compile("")) == 0
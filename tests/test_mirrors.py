@@ -0,0 +1,94 @@
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from xtream_client import XtreamClient
+
+
+def panel(delay, status=200):
+    """Espejo falso con demora configurable (delay es mutable: server.delay = ...)"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            server.hits += 1
+            time.sleep(server.delay)
+            body = b'[1,2,3]'
+            try:
+                self.send_response(server.status)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except OSError:
+                pass  # el cliente cerró la perdedora
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    server.delay, server.status, server.hits = delay, status, 0
+    server.host = f'127.0.0.1:{server.server_port}'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def panels():
+    started = []
+
+    def start(delay, status=200):
+        started.append(panel(delay, status))
+        return started[-1]
+
+    yield start
+    for server in started:
+        server.shutdown()
+        server.server_close()
+
+
+def api(host):
+    return f'http://{host}/player_api.php?username=u&password=p'
+
+
+def test_hedged_request_wins_with_fast_mirror(panels):
+    slow, fast = panels(1.5), panels(0.01)
+    client = XtreamClient(retries=0, hedge_min_delay=0.1)
+    client.register_mirrors([slow.host, fast.host])
+    started = time.monotonic()
+    res = client.get_action(api(slow.host), 'get_vod_categories')
+    assert time.monotonic() - started < 1.0
+    assert res.json() == [1, 2, 3] and fast.host in res.url
+    assert client.hedges == 1
+    # La EWMA ya conoce al rápido: la siguiente va directo a él
+    res = client.get_action(api(slow.host), 'get_vod_categories')
+    assert fast.host in res.url and client.hedges == 1
+
+
+def test_failed_mirror_falls_over_to_the_next(panels):
+    alive = panels(0.01)
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        dead = f'127.0.0.1:{s.getsockname()[1]}'  # nadie escucha
+    client = XtreamClient(retries=0, hedge_min_delay=0.1)
+    client.register_mirrors([dead, alive.host])
+    res = client.get_action(api(dead), 'get_live_categories')
+    assert res.status_code == 200 and alive.host in res.url
+    assert client.latency(dead) >= 1.0  # penalizado
+
+
+def test_error_status_is_kept_only_as_fallback(panels):
+    broken, good = panels(0.01, status=404), panels(0.2)
+    client = XtreamClient(retries=0, hedge_min_delay=0.05)
+    client.register_mirrors([broken.host, good.host])
+    res = client.get_action(api(broken.host), 'get_series_categories')
+    assert res.status_code == 200 and good.host in res.url
+
+
+def test_without_mirrors_goes_straight_to_the_host(panels):
+    only = panels(0.01)
+    client = XtreamClient(retries=0)
+    assert client.mirror_urls(api(only.host)) == [api(only.host)]
+    assert client.get_action(api(only.host), 'get_series').json() == [1, 2, 3]
+    assert client.hedges == 0
@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+
+from quota import ADMIN, BACKGROUND, LOGIN, QuotaScheduler, TokenBucket, is_quota_error
+
+
+class QuotaError(Exception):
+    class response:
+        status_code = 429
+
+
+def test_bucket_allows_a_burst_then_throttles():
+    bucket = TokenBucket(rate=20, capacity=3)
+    assert [bucket.acquire() < 0.01 for _ in range(3)] == [True] * 3
+    waited = bucket.acquire()
+    assert 0.02 < waited < 0.2
+    assert bucket.stats()['throttled'] == 1
+
+
+def test_waiters_are_served_by_priority():
+    bucket = TokenBucket(rate=5, capacity=1)
+    bucket.acquire()
+    order, threads = [], []
+    for priority in (ADMIN, BACKGROUND, LOGIN):
+        thread = threading.Thread(target=lambda p=priority: (bucket.acquire(p), order.append(p)))
+        thread.start()
+        threads.append(thread)
+        while bucket.stats()['queued'] < len(threads):
+            time.sleep(0.001)
+    for thread in threads:
+        thread.join()
+    # Llegaron en orden inverso, pero cada token va al de mayor prioridad que espera
+    assert order == [LOGIN, BACKGROUND, ADMIN]
+
+
+def test_drain_makes_everyone_wait():
+    bucket = TokenBucket(rate=50, capacity=5)
+    bucket.drain()
+    assert bucket.acquire() > 0.01
+
+
+def test_identical_reads_are_merged():
+    scheduler = QuotaScheduler(reads_per_minute=600, merge_window=60)
+    calls = []
+    read = lambda: calls.append(1) or len(calls)
+    assert scheduler.run('read', read, key='users') == 1
+    assert scheduler.run('read', read, key='users') == 1
+    scheduler.run('write', lambda: None, invalidates=('users',))
+    assert scheduler.run('read', read, key='users') == 2
+    assert scheduler.stats()['merged'] == 1
+
+
+def test_quota_errors_are_retried(monkeypatch):
+    monkeypatch.setattr(time, 'sleep', lambda s: None)
+    scheduler = QuotaScheduler(reads_per_minute=6000, retries=2)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise QuotaError()
+        return 'ok'
+
+    assert scheduler.run('read', flaky) == 'ok'
+    assert scheduler.quota_errors == 2
+    assert is_quota_error(QuotaError()) and not is_quota_error(ValueError())
+    with pytest.raises(ValueError):
+        scheduler.run('write', lambda: int('x'))
@@ -0,0 +1,23 @@
+from catalog import Catalog
+from catalog_cache import CatalogCache
+from render import PAGE_SIZE, render_channel_rows, render_vod_grid
+
+
+def make_catalog(n=100):
+    return Catalog([{'stream_id': i, 'num': i, 'name': f'Canal {i}', 'category_id': '1'} for i in range(n)])
+
+
+def test_pages_and_cards_are_memoized():
+    cache, catalog = CatalogCache(), make_catalog()
+    first = render_channel_rows(cache, catalog, {'1': 'Noticias'}, range(100))
+    entries = cache.stats()['entries']
+    assert entries == 100 + 2  # tarjetas + páginas de PAGE_SIZE
+    assert render_channel_rows(cache, catalog, {'1': 'Noticias'}, range(100)) == first
+    assert cache.stats()['entries'] == entries and PAGE_SIZE == 60
+
+
+def test_renamed_folders_are_not_served_from_cache():
+    cache, catalog = CatalogCache(), make_catalog(3)
+    assert 'Noticias' in render_vod_grid(cache, catalog, {'1': 'Noticias'}, range(3))
+    html = render_vod_grid(cache, catalog, {'1': 'Informativos'}, range(3))
+    assert 'Informativos' in html and 'Noticias' not in html
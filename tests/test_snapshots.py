@@ -0,0 +1,28 @@
+import time
+
+from catalog import Catalog
+from snapshots import SnapshotStore
+
+
+def test_roundtrip_catalog(tmp_path):
+    store = SnapshotStore(str(tmp_path / 's.sqlite3'))
+    store.save('panel:80|a', 'get_live_streams', Catalog([{'stream_id': 1, 'name': 'Uno', 'category_id': '1'}]))
+    catalog, saved_at = store.load('panel:80|a', 'get_live_streams')
+    assert catalog.names[0] == 'Uno' and not store.is_stale(saved_at)
+    assert store.load('panel:80|a', 'get_vod_streams') is None
+
+
+def test_total_size_is_bounded(tmp_path):
+    store = SnapshotStore(str(tmp_path / 's.sqlite3'), max_bytes=2500)
+    for n in range(5):
+        store.save(f'cuenta{n}', 'get_series', 'x' * 1000)
+        time.sleep(0.01)
+    assert [store.load(f'cuenta{n}', 'get_series') is not None for n in range(5)] == [False] * 3 + [True] * 2
+    assert store.evictions == 3
+
+
+def test_old_snapshots_are_pruned_on_open(tmp_path):
+    path = str(tmp_path / 's.sqlite3')
+    SnapshotStore(path).save('cuenta', 'get_series', [1, 2, 3])
+    store = SnapshotStore(path, keep_for=0)
+    assert store.load('cuenta', 'get_series') is None
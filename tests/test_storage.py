@@ -0,0 +1,26 @@
+import pytest
+
+from storage import SQLiteStorage, Storage, open_storage
+
+
+def test_storage_is_abstract():
+    with pytest.raises(TypeError):
+        Storage()
+
+
+def test_sqlite_users_and_connections(tmp_path):
+    db = open_storage('sqlite', path=str(tmp_path / 'iptv.sqlite3'))
+    assert isinstance(db, SQLiteStorage)
+    db.add_user('ana', '1.2.3.4', 'vip')
+    db.update_user('ana', '1.2.3.0/24')
+    assert db.list_users() == [{'username': 'ana', 'allowed_ip': '1.2.3.0/24', 'notas': ''}]
+    with pytest.raises(KeyError):
+        db.delete_user('bob')
+    db.append_connections([[f'2026-01-0{i} 10:00:00', 'ana', f'iptv{i}', 'p', 'panel:80'] for i in range(1, 4)])
+    assert [c['usuario_iptv'] for c in db.connections_since(1)] == ['iptv2', 'iptv3']
+    assert len(db.list_connections()) == 3
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        open_storage('excel')
@@ -0,0 +1,76 @@
+import threading
+
+import pytest
+import requests
+
+from xtream_client import XtreamClient
+
+SLOW = 'http://panel:80/player_api.php?username=lento'
+FAST = 'http://panel:80/player_api.php?username=rapido'
+
+
+class FakeResponse:
+    status_code = 200
+    ok = True
+    content = b'{}'
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+@pytest.fixture
+def gate(monkeypatch):
+    """Las peticiones a SLOW no reciben cabeceras hasta que se abre la compuerta"""
+    gate = threading.Event()
+    gate.entered = threading.Event()
+
+    def get(session, url, **kwargs):
+        if url.startswith(SLOW):
+            gate.entered.set()
+            assert gate.wait(5)
+        return FakeResponse()
+
+    monkeypatch.setattr(requests.Session, 'get', get)
+    yield gate
+    gate.set()
+
+
+def start_slow(client, gate):
+    thread = threading.Thread(target=client.get_action, args=(SLOW, 'get_series'))
+    thread.start()
+    assert gate.entered.wait(5)
+    return thread
+
+
+def test_slot_is_held_while_the_body_is_read(gate):
+    client = XtreamClient(max_per_host=1)
+    with client.stream_action(FAST, 'get_live_streams'):
+        # Otra descarga del mismo host espera a que se termine de leer el cuerpo
+        with pytest.raises(requests.Timeout):
+            client.get_action(FAST, 'get_vod_streams', timeout=0.2)
+        # El login va por su propio carril
+        assert client.account_info(FAST, timeout=0.2).status_code == 200
+    client.get_action(FAST, 'get_vod_streams', timeout=0.2)
+
+
+def test_waiting_for_a_slot_times_out(gate):
+    client = XtreamClient(max_per_host=1)
+    slow = start_slow(client, gate)
+    with pytest.raises(requests.Timeout):
+        client.get_action(FAST, 'get_series', timeout=0.2)
+    gate.set()
+    slow.join()
+
+
+def test_login_does_not_wait_behind_downloads(gate):
+    client = XtreamClient(max_per_host=1)
+    slow = start_slow(client, gate)
+    assert client.account_info(FAST, timeout=0.5).status_code == 200
+    gate.set()
+    slow.join()
@@ -0,0 +1,85 @@
+# Directorio de usuarios en memoria: índice username -> redes permitidas compiladas, refrescado en segundo plano
+import threading
+import time
+
+from ip_match import IPMatcher
+
+
+def build_user_index(records):
+    """Filas de Sheet1 -> {username: IPMatcher(allowed_ip)} (la primera fila de cada usuario manda)"""
+    index = {}
+    for record in records:
+        username = str(record.get('username', '')).strip()
+        if username and username not in index:
+            index[username] = IPMatcher.compile(record.get('allowed_ip', ''))
+    return index
+
+
+class UserDirectory:
+    """Índice de usuarios con stale-while-revalidate: solo la primera carga espera a la hoja"""
+
+    def __init__(self, loader, ttl=60, build=build_user_index):
+        self.loader = loader  # función que devuelve las filas (lista de dicts)
+        self.ttl = ttl
+        self.build = build
+        self._lock = threading.Lock()
+        self._first_load = threading.Lock()  # una sola carga inicial aunque entren varias sesiones
+        self._refreshing = False
+        self._index = None
+        self._loaded_at = 0.0
+        self.refreshes = 0
+        self.errors = 0
+
+    def lookup(self, username):
+        """IPs permitidas del usuario, None si no existe; lanza RuntimeError si nunca se pudo cargar"""
+        index = self.index()
+        if index is None:
+            raise RuntimeError("Directorio de usuarios no disponible")
+        return index.get(str(username).strip())
+
+    def index(self):
+        """Índice actual; si está vencido se devuelve igual y se refresca en segundo plano"""
+        if self._index is None:
+            with self._first_load:
+                if self._index is None:
+                    self.refresh()
+        elif time.monotonic() - self._loaded_at > self.ttl:
+            self._refresh_async()
+        return self._index
+
+    def refresh(self):
+        """Recarga síncrona; si falla se conserva el índice anterior"""
+        try:
+            index = self.build(self.loader())
+        except Exception as e:
+            self.errors += 1
+            print(f"Error cargando usuarios: {e}")
+            return False
+        with self._lock:
+            self._index = index
+            self._loaded_at = time.monotonic()
+            self.refreshes += 1
+        return True
+
+    def _refresh_async(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                if not self.refresh():
+                    # Reintentar tras un TTL en vez de en cada petición
+                    with self._lock:
+                        self._loaded_at = time.monotonic()
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def stats(self):
+        with self._lock:
+            return {"users": len(self._index or ()), "age": time.monotonic() - self._loaded_at,
+                    "refreshes": self.refreshes, "errors": self.errors}
@@ -0,0 +1,242 @@
+# Cliente HTTP compartido para paneles Xtream (player_api.php)
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0",
+    "Accept-Encoding": "gzip, deflate",
+}
+
+# Timeouts (segundos) por acción; None = login / info de cuenta
+ACTION_TIMEOUTS = {
+    None: 25,
+    'get_live_streams': 30,
+    'get_vod_streams': 30,
+    'get_series': 30,
+    'get_live_categories': 20,
+    'get_vod_categories': 20,
+    'get_series_categories': 20,
+}
+
+
+class XtreamClient:
+    """Sesiones keep-alive por host con gzip, reintentos con backoff y límite de concurrencia por host.
+
+    Si un panel tiene espejos registrados, las peticiones se cubren (hedging): se lanza al
+    espejo más rápido conocido y, si no responde a tiempo, también al siguiente; gana la
+    primera respuesta y las demás se cierran. La latencia de cada espejo se sigue con una EWMA.
+
+    El turno por host se toma con el mismo timeout de la petición y dura hasta cerrar la respuesta
+    (acota las descargas simultáneas y las conexiones keep-alive del pool); los logins (acción
+    None) tienen su propio carril para no esperar a las descargas.
+    """
+
+    EWMA_ALPHA = 0.3
+
+    def __init__(self, max_per_host=4, retries=2, backoff=0.5, timeouts=None,
+                 hedge_fanout=2, hedge_min_delay=0.3):
+        self.max_per_host = max_per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.timeouts = dict(ACTION_TIMEOUTS, **(timeouts or {}))
+        self.hedge_fanout = hedge_fanout
+        self.hedge_min_delay = hedge_min_delay
+        self._lock = threading.Lock()
+        self._sessions = {}  # host:puerto -> requests.Session
+        self._slots = {}  # (host:puerto, carril) -> semáforo de peticiones simultáneas
+        self._mirrors = {}  # host:puerto -> tupla con todos los hosts del mismo backend
+        self._latency = {}  # host:puerto -> EWMA del tiempo hasta la respuesta (s)
+        self.hedges = 0  # peticiones extra lanzadas por hedging
+
+    def register_mirrors(self, hosts):
+        """Registra varios host:puerto como espejos del mismo panel"""
+        group = tuple(dict.fromkeys(h.strip().lower() for h in hosts if h.strip()))
+        with self._lock:
+            for host in group:
+                self._mirrors[host] = group
+
+    def mirror_urls(self, url):
+        """La URL reescrita para cada espejo de su host (ella misma primero)"""
+        parsed = urlparse(url)
+        host = parsed.netloc.lower()
+        group = self._mirrors.get(host, (host,))
+        return [url] + [parsed._replace(netloc=h).geturl() for h in group if h != host]
+
+    def latency(self, host):
+        return self._latency.get(host.lower())
+
+    def _observe(self, host, elapsed):
+        """Actualiza la EWMA de un host (elapsed None = falló: se penaliza)"""
+        with self._lock:
+            prev = self._latency.get(host)
+            if elapsed is None:
+                self._latency[host] = max(prev * 2, 1.0) if prev else 5.0
+            elif prev is None:
+                self._latency[host] = elapsed
+            else:
+                self._latency[host] = prev + self.EWMA_ALPHA * (elapsed - prev)
+
+    def _host(self, url):
+        return urlparse(url).netloc.lower()
+
+    def _lane(self, action):
+        return 'login' if action is None else 'data'
+
+    def _session(self, host, lane='data'):
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                retry = Retry(
+                    total=self.retries, connect=self.retries, read=self.retries,
+                    status_forcelist=(500, 502, 503, 504), allowed_methods=frozenset(['GET']),
+                    backoff_factor=self.backoff, raise_on_status=False,
+                )
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_per_host, max_retries=retry)
+                session = requests.Session()
+                session.headers.update(DEFAULT_HEADERS)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._sessions[host] = session
+            slot = self._slots.get((host, lane))
+            if slot is None:
+                slot = self._slots[(host, lane)] = threading.BoundedSemaphore(self.max_per_host)
+            return session, slot
+
+    def _acquire(self, slot, host, timeout):
+        """Toma un turno del host esperando como mucho el timeout de la petición"""
+        wait = timeout[0] if isinstance(timeout, tuple) else timeout
+        if not slot.acquire(timeout=wait):
+            raise requests.Timeout(f"{host}: sin turno libre tras {wait}s")
+
+    def timeout_for(self, action):
+        return self.timeouts.get(action, self.timeouts[None])
+
+    def get(self, url, action=None, timeout=None):
+        """GET completo (el cuerpo queda leído al salir)"""
+        with self.stream(url, action, timeout) as res:
+            res.content
+            return res
+
+    @contextmanager
+    def stream(self, url, action=None, timeout=None):
+        """GET en streaming; el turno del host se mantiene mientras se consume el cuerpo"""
+        timeout = timeout or self.timeout_for(action)
+        urls = self.mirror_urls(url)
+        if len(urls) == 1:
+            res, slot = self._request(url, self._lane(action), timeout)
+        else:
+            res, slot = self._hedged(urls, self._lane(action), timeout)
+        try:
+            with res:
+                yield res
+        finally:
+            slot.release()
+
+    def _request(self, url, lane, timeout):
+        """GET en streaming: (respuesta, turno del host tomado); quien llama cierra y suelta"""
+        host = self._host(url)
+        session, slot = self._session(host, lane)
+        self._acquire(slot, host, timeout)
+        started = time.monotonic()
+        try:
+            res = session.get(url, timeout=timeout, stream=True)
+        except Exception:
+            slot.release()
+            self._observe(host, None)
+            raise
+        self._observe(host, time.monotonic() - started)
+        return res, slot
+
+    def _discard(self, response):
+        """Cierra una respuesta que no se va a leer y suelta su turno"""
+        res, slot = response
+        res.close()
+        slot.release()
+
+    def _hedged(self, urls, lane, timeout):
+        """Corre la misma petición contra los espejos (del más rápido al más lento).
+
+        Devuelve (respuesta, turno) de la ganadora; las demás se cierran y sueltan su turno.
+        """
+        queue = sorted(urls, key=lambda u: self._latency.get(self._host(u), self.hedge_min_delay))
+        lock = threading.Lock()
+        changed = threading.Event()
+        state = {'winner': None, 'fallback': None, 'error': None, 'running': 0}
+
+        def attempt(url):
+            response = error = None
+            try:
+                response = self._request(url, lane, timeout)
+            except Exception as e:
+                error = e
+            with lock:
+                state['running'] -= 1
+                if response is not None and response[0].ok and state['winner'] is None:
+                    state['winner'], response = response, None
+                elif response is not None and state['fallback'] is None:
+                    state['fallback'], response = response, None
+                elif error is not None:
+                    state['error'] = error
+            if response is not None:
+                self._discard(response)  # perdedora: no se descarga el cuerpo
+            changed.set()
+
+        def launch(url):
+            with lock:
+                state['running'] += 1
+            threading.Thread(target=attempt, args=(url,), daemon=True).start()
+
+        # Se espera ~2x la latencia típica del espejo más rápido antes de cubrir con el siguiente
+        best = self._latency.get(self._host(queue[0]))
+        delay = max(self.hedge_min_delay, 2 * best) if best else self.hedge_min_delay
+        launch(queue.pop(0))
+        while True:
+            with lock:
+                if state['winner'] is not None or (not queue and state['running'] == 0):
+                    break
+                running = state['running']
+            timed_out = not changed.wait(delay if queue else timeout)
+            changed.clear()
+            if queue and (running == 0 or (timed_out and running < self.hedge_fanout)):
+                self.hedges += running > 0
+                launch(queue.pop(0))
+
+        with lock:
+            winner, fallback = state['winner'], state['fallback']
+            # Las que terminen después se cierran solas en attempt()
+            state['winner'] = state['fallback'] = winner or fallback or True
+        if winner is not None:
+            if fallback is not None:
+                self._discard(fallback)
+            return winner
+        if fallback is not None:
+            return fallback
+        raise state['error'] or requests.ConnectionError("Ningún espejo respondió")
+
+    def action_url(self, api, action):
+        return f"{api}&action={action}"
+
+    def get_action(self, api, action, timeout=None):
+        return self.get(self.action_url(api, action), action, timeout)
+
+    @contextmanager
+    def stream_action(self, api, action, timeout=None):
+        with self.stream(self.action_url(api, action), action, timeout) as res:
+            yield res
+
+    def account_info(self, api, timeout=None):
+        """Petición de login (player_api.php sin acción)"""
+        return self.get(api, None, timeout)
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            self._slots.clear()